@@ -4,37 +4,64 @@ class Alignment:
     CENTER = 'center'
     TOP = 'top'
     BOTTOM = 'bottom'
+    __slots__ = ('aligns', 'parts', 'horizontal', 'vertical')
+    # Alignments are immutable, so equal ones are the same object
+    interned = {}
 
-    def __init__(self, *aligns):
-        self.aligns = list(set(list(aligns) + [Alignment.CENTER]))
-        if Alignment.TOP in self.aligns and Alignment.BOTTOM in self.aligns:
+    def __new__(cls, *aligns):
+        aligns = frozenset(aligns) | {Alignment.CENTER}
+        alignment = cls.interned.get(aligns)
+        if alignment is not None:
+            return alignment
+        if Alignment.TOP in aligns and Alignment.BOTTOM in aligns:
             raise OppositeAlignmentError('Align.TOP and Align.BOTTOM can`t \
 be used together')
-        if Alignment.LEFT in self.aligns and Alignment.RIGHT in self.aligns:
+        if Alignment.LEFT in aligns and Alignment.RIGHT in aligns:
             raise OppositeAlignmentError('Align.LEFT and Align.RIGHT can`t \
 be used together')
-        if (Alignment.TOP in self.aligns or Alignment.BOTTOM in self.aligns)\
-                and (Alignment.LEFT in self.aligns or
-                             Alignment.RIGHT in self.aligns) and\
-                        Alignment.CENTER in self.aligns:
-            self.aligns.remove(Alignment.CENTER)
+        horizontal = Alignment.CENTER
+        for align in (Alignment.LEFT, Alignment.RIGHT):
+            if align in aligns:
+                horizontal = align
+        vertical = Alignment.CENTER
+        for align in (Alignment.TOP, Alignment.BOTTOM):
+            if align in aligns:
+                vertical = align
+        alignment = super().__new__(cls)
+        set_attr = super(Alignment, alignment).__setattr__
+        set_attr('aligns', aligns - {Alignment.CENTER}
+                 if Alignment.CENTER not in (horizontal, vertical) else aligns)
+        set_attr('parts', aligns - {Alignment.CENTER})
+        set_attr('horizontal', horizontal)
+        set_attr('vertical', vertical)
+        cls.interned[aligns] = alignment
+        return alignment
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Alignment objects are immutable')
+
+    def __reduce__(self):
+        return Alignment, tuple(self.aligns)
 
     def __and__(self, align):
         if isinstance(align, Alignment):
-            return Alignment(*align.aligns + self.aligns)
+            return Alignment(*align.aligns, *self.aligns)
         else:
             raise NotAlignmentError('Argument is not an Align object')
 
     def __eq__(self, align):
+        # Align.LEFT & Align.TOP is equal to Align.LEFT, Align.TOP and itself
         if isinstance(align, Alignment):
-            return all([al in self.aligns
-                        for al in align.aligns if al != Alignment.CENTER])
+            return self.parts >= align.parts
         else:
             raise NotAlignmentError('Argument is not an Align object')
 
     def __ne__(self, align):
         return not self == align
 
+    def __repr__(self):
+        return 'Alignment({}, {})'.format(self.horizontal, self.vertical)
+
 
 class Align:
     LEFT = Alignment(Alignment.LEFT)
@@ -1,16 +1,31 @@
+import math
+import time
+from bisect import bisect_left
+from itertools import accumulate, islice
+
 import pygame as pg
 import pygame.draw as dr
 
-from functions import do_nothing
-from base_widgets import BaseWidget, Button, Label, Image
-from additional_classes import HorAlign, ElementFunctionAtCycle
+from functions import do_nothing, get_text_size, get_chrome, get_font,\
+    get_light_color, get_glyph_advance
+from base_widgets import BaseWidget, EditorMixin, PushButton, Label, Image
+from additional_classes import Align, ElementFunctionAtCycle
+from caches import LRUCache
+from models import ListModel, GapBuffer
+from scheduling import timers
 
 
 class TabWidget(BaseWidget):
+    __slots__ = ('main_color', 'light_main_color', 'current_color',
+                 'back_color', 'rects_w', 'bord_rad', 'text_indent',
+                 'titles_names', 'selected_index', 'titles_h',
+                 'title_font_size', 'direct_render', 'surface', 'tab_surfaces',
+                 'widgets')
+
     def __init__(self, parent, rect, titles, titles_h=40,
                  title_font_size=30,
                  main_color=pg.Color(20, 224, 54),
-                 back_color=pg.Color(0, 0, 0)):
+                 back_color=pg.Color(0, 0, 0), direct_render=False):
         super().__init__(parent, rect)
         self.main_color = main_color
         self.light_main_color = pg.Color(min(self.main_color.r + 90, 255),
@@ -27,41 +42,54 @@ class TabWidget(BaseWidget):
         self.selected_index = 0
         self.titles_h = titles_h
         self.title_font_size = title_font_size
+        self.direct_render = direct_render
+        self.surface = None
+        self.tab_surfaces = {}
         self.widgets = []
-        x, y = self.x + self.bord_rad, self.y
+        x, y = self.rect.x + self.bord_rad, self.rect.y
         for i, ttl in enumerate(self.titles_names):
-            title_font = pg.font.Font(None, self.title_font_size)
-            title = title_font.render(ttl, True, self.main_color)
-            w, h = title.get_width() + self.text_indent * 2, self.titles_h
+            title_w = get_text_size(ttl, self.title_font_size)[0]
+            w, h = title_w + self.text_indent * 2, self.titles_h
             color = self.light_main_color if i == self.selected_index\
                 else self.main_color
-            self.widgets.append([[], Button(self.parent, (x, y, w, h), ttl,
-                                            font_size=self.title_font_size,
-                                            main_color=color,
-                                            slot=self.change_selected)])
+            self.widgets.append([[], PushButton(self, (x, y, w, h),
+                                                ttl,
+                                                font_size=self.title_font_size,
+                                                main_color=color,
+                                                slot=self.change_selected)])
             x += w + self.rects_w * 2
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
-        dr.rect(screen, self.back_color,
-                (self.x, self.y + self.titles_h - self.rects_w // 2,
-                 self.w, self.h - self.titles_h + self.rects_w // 2),
-                border_radius=self.bord_rad)
-        dr.rect(screen, self.main_color,
-                (self.x, self.y + self.titles_h - self.rects_w // 2,
-                 self.w, self.h - self.titles_h + self.rects_w // 2),
-                width=self.rects_w, border_radius=self.bord_rad)
+        screen.blit(get_chrome(self.get_surface_size(), self.back_color,
+                               self.main_color, self.rects_w, self.bord_rad),
+                    (self.rect.x,
+                     self.rect.y + self.titles_h - self.rects_w // 2))
         for i, title in enumerate(self.titles_names):
-            self.widgets[i][1].render()
-            if i == self.selected_index:
-                self.surface = pg.Surface(self.get_surface_size(),
-                                          pg.SRCALPHA, 32)
-                self.surface.fill(pg.Color(0, 0, 0, 1))
-                for widget in self.widgets[i][0]:
-                    widget.render(screen=self.surface)
-                pg.Surface.blit(screen, self.surface, (self.x,
-                                                       self.y + self.titles_h\
-                                                       - self.rects_w // 2))
+            self.widgets[i][1].render(screen)
+        self.render_tab(screen)
+
+    def render_tab(self, screen):
+        tab_widgets = self.widgets[self.selected_index][0]
+        area = pg.Rect((self.rect.x,
+                        self.rect.y + self.titles_h - self.rects_w // 2),
+                       self.get_surface_size())
+        if self.direct_render and screen.get_rect().contains(area):
+            surface = screen.subsurface(area)
+            surface.set_clip(screen.get_clip().move(-area.x, -area.y))
+            for widget in tab_widgets:
+                widget.render(screen=surface)
+            return
+        self.surface = self.tab_surfaces.get(self.selected_index)
+        if self.surface is None or self.surface.get_size() != area.size:
+            self.surface = pg.Surface(area.size, pg.SRCALPHA, 32)
+            self.surface.fill(pg.Color(0, 0, 0, 1))
+            # Stored before drawing, so a child invalidating itself while
+            # it is drawn drops the surface again
+            self.tab_surfaces[self.selected_index] = self.surface
+            for widget in tab_widgets:
+                widget.render(screen=self.surface)
+        pg.Surface.blit(screen, self.surface, area)
 
     def process_event(self, event, *args, **kwargs):
         for i, title in enumerate(self.titles_names):
@@ -70,36 +98,72 @@ class TabWidget(BaseWidget):
                 widget.process_event(event)
 
     def change_selected(self, index):
+        if index != self.selected_index:
+            for widget in self.widgets[self.selected_index][0]:
+                widget.deactivate()
         self.selected_index = index
         self.widgets[self.selected_index][1].set_color(self.light_main_color)
         for i in range(len(self.titles_names)):
             if i != self.selected_index:
                 self.widgets[i][1].set_color(self.main_color)
+        self.mark_dirty()
+
+    def child_changed(self, widget):
+        for i, (tab_widgets, title) in enumerate(self.widgets):
+            if widget in tab_widgets:
+                self.tab_surfaces.pop(i, None)
+        self.mark_dirty()
+
+    def deactivate(self):
+        for tab_widgets, title in self.widgets:
+            for widget in tab_widgets:
+                widget.deactivate()
+
+    def invalidate(self, index=None):
+        if index is None:
+            self.tab_surfaces.clear()
+        else:
+            self.tab_surfaces.pop(index, None)
+        self.mark_dirty()
 
     def get_widgets(self, index):
         return self.widgets[index][0]
 
     def set_widgets(self, widgets, index):
+        for widget in self.widgets[index][0]:
+            if widget not in widgets:
+                widget.deactivate()
         tab_widgets = []
         for wid in widgets:
             wid.parent = self
             tab_widgets.append(wid)
         self.widgets[index][0] = tab_widgets
+        self.invalidate(index)
 
     def add_widgets(self, widgets, index):
         for wid in widgets:
             wid.parent = self
             self.widgets[index][0].append(wid)
+        self.invalidate(index)
 
     def trans_pos(self, pos):
-        return (pos[0] - self.x,
-                pos[1] - self.y - self.titles_h + self.rects_w // 2)
+        return (pos[0] - self.rect.x,
+                pos[1] - self.rect.y - self.titles_h + self.rects_w // 2)
 
     def get_surface_size(self):
-        return (self.w, self.h - self.titles_h + self.rects_w // 2)
+        return (self.rect.w, self.rect.h - self.titles_h + self.rects_w // 2)
 
 
 class ScrollList(BaseWidget):
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION, pg.MOUSEWHEEL)
+    HIT_EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION)
+    __slots__ = ('main_color', 'back_color', 'select_func', 'rects_w',
+                 'bord_rad', 'indent', 'n_vizible', 'friction', 'min_speed',
+                 'scroll_y', 'speed', 'scroll_timer', 'scroll_time', 'surface',
+                 'drawn_scroll_y', 'changed_rows', 'binding', 'model', 'rows',
+                 'button', 'up_index', 'selected_index', 'selected_source',
+                 'title', 'title_font_size', 'title_label', 'filter_task')
+
     def __init__(self, parent, rect, title,
                  title_font_size=50, n_vizible=5,
                  main_color=pg.Color(245, 127, 17),
@@ -115,99 +179,289 @@ class ScrollList(BaseWidget):
         self.bord_rad = 6
         self.indent = 10
         self.n_vizible = n_vizible
+        # Scrolling: friction is the speed decay per second, a wheel step
+        # scrolls one row in total
+        self.friction = 8
+        self.min_speed = 5
+
+        self.scroll_y = 0
+        self.speed = 0
+        self.scroll_timer = None
+        self.scroll_time = None
+        self.surface = None
+        self.drawn_scroll_y = 0
+        self.changed_rows = set()
+        self.binding = False
+
+        self.model = None
+        self.rows = []
+        self.button = None
+        self.up_index = None
+        self.selected_index = None
+        self.selected_source = None
+        self.filter_task = None
 
         self.title = title
         self.title_font_size = title_font_size
         self.title_label = Label(self, (self.indent, self.indent,
-                                        self.w - 2 * self.indent,
+                                        self.rect.w - 2 * self.indent,
                                         self.title_font_size), self.title,
                                  font_size=self.title_font_size,
                                  main_color=self.main_color,
-                                 alignment=HorAlign.CENTER)
+                                 alignment=Align.CENTER)
 
-        self.elements = []
-        self.up_index = None
-        self.selected_index = None
+        self.set_model(ListModel())
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
-        dr.rect(screen, self.back_color, (self.x, self.y, self.w, self.h),
-                border_radius=self.bord_rad)
-        dr.rect(screen, self.main_color, (self.x, self.y, self.w, self.h),
-                width=self.rects_w, border_radius=self.bord_rad)
-
-        surface = pg.Surface((self.w, self.h), pg.SRCALPHA, 32)
-        surface.fill(pg.Color(0, 0, 0, 1))
-        self.title_label.render(surface)
-        if self.up_index is None:
-            pg.Surface.blit(screen, surface, (self.x, self.y))
+        screen.blit(get_chrome(self.rect.size, self.back_color,
+                               self.main_color, self.rects_w, self.bord_rad),
+                    self.rect.topleft)
+        if self.surface is None or self.surface.get_size() != self.rect.size:
+            self.surface = pg.Surface(self.rect.size, pg.SRCALPHA, 32)
+            self.surface.fill(pg.Color(0, 0, 0, 1))
+            self.title_label.render(self.surface)
+            self.draw_rows(self.get_view_rect())
+        else:
+            self.scroll_surface()
+            view = self.get_view_rect()
+            for row in self.changed_rows:
+                self.draw_rows(row.rect.clip(view))
+        self.changed_rows.clear()
+        pg.Surface.blit(screen, self.surface, self.rect.topleft)
+
+    def scroll_surface(self):
+        # The rows drawn on the previous frame are moved, only the strip
+        # which has come into view is drawn again
+        view = self.get_view_rect()
+        delta = round(self.scroll_y) - self.drawn_scroll_y
+        self.drawn_scroll_y = round(self.scroll_y)
+        if not delta:
             return
-
-        x, y = self.indent, 2 * self.indent + self.title_label.h
-        els = self.elements[self.up_index:self.up_index + self.n_vizible]
-        for i, el in enumerate(els):
-            if self.up_index + i == self.selected_index:
-                el.set_selected(True)
-            else:
-                el.set_selected(False)
-            el.set_coords(x, y)
-            el.set_number(self.up_index + i + 1)
-            el.render(surface)
-            y += self.indent + el.h
-        pg.Surface.blit(screen, surface, (self.x, self.y))
+        if abs(delta) >= view.h:
+            self.draw_rows(view)
+            return
+        self.surface.subsurface(view).scroll(0, -delta)
+        if delta > 0:
+            self.draw_rows(pg.Rect(view.x, view.bottom - delta, view.w, delta))
+        else:
+            self.draw_rows(pg.Rect(view.x, view.y, view.w, -delta))
+
+    def draw_rows(self, area):
+        if area.w <= 0 or area.h <= 0:
+            return
+        self.drawn_scroll_y = round(self.scroll_y)
+        self.surface.set_clip(area)
+        self.surface.fill(pg.Color(0, 0, 0, 1))
+        if self.up_index is not None:
+            for row in self.rows:
+                if row.rect.colliderect(area):
+                    row.render(self.surface)
+        self.surface.set_clip(None)
 
     def process_event(self, event, *args, **kwargs):
         if self.up_index is None:
             return
         if event.type == pg.MOUSEWHEEL:
             if pg.mouse.get_pos() in self:
-                self.change_up(1 if event.y < 0 else -1)
+                self.fling(-event.y)
         if event.type == pg.MOUSEBUTTONDOWN:
             if event.button == 1 and\
                             self.trans_pos(event.pos) in self.title_label:
-                self.selected_index = None
+                self.set_selected_index(None)
                 self.select_func()
-        els = self.elements[self.up_index:self.up_index + self.n_vizible]
-        for i, el in enumerate(els):
+            if not self.get_view_rect().collidepoint(
+                    self.trans_pos(event.pos)):
+                return
+        for row in self.rows:
             try:
-                self.elements[self.up_index + i].process_event(event, *args,
-                                                               **kwargs)
+                row.process_event(event, *args, **kwargs)
             except ElementFunctionAtCycle as ex:
                 break
 
     def change_up(self, delta):
         new_index = self.up_index + delta
-        if 0 <= new_index < len(self.elements) - self.n_vizible + 1:
-            self.up_index = new_index
+        if 0 <= new_index < len(self.model) - self.n_vizible + 1:
+            self.speed = 0
+            self.set_scroll(new_index * self.get_row_pitch())
+
+    def fling(self, rows):
+        # The speed decays exponentially, so it travels speed / friction
+        # pixels in total
+        if self.speed * rows < 0:
+            self.speed = 0
+        self.speed += rows * self.get_row_pitch() * self.friction
+        if self.scroll_timer is None:
+            self.scroll_time = time.monotonic()
+            self.scroll_timer = timers.call_later(1 / 60, self.scroll_step)
+
+    def scroll_step(self):
+        now = time.monotonic()
+        delta, self.scroll_time = now - self.scroll_time, now
+        # Exact travel of an exponentially decaying speed during delta
+        decay = math.exp(-self.friction * delta)
+        self.set_scroll(self.scroll_y + self.speed * (1 - decay) /
+                        self.friction)
+        self.speed *= decay
+        if self.scroll_y in (0, self.get_max_scroll()) or\
+                abs(self.speed) < self.min_speed:
+            self.speed = 0
+            self.scroll_timer = None
+            return
+        self.scroll_timer = timers.call_later(1 / 60, self.scroll_step)
 
-    def set_elements(self, elements, button=None):
-        self.elements = []
-        h = (self.h - 3 * self.indent - self.title_label.h) //\
+    def set_scroll(self, scroll_y):
+        scroll_y = max(0, min(scroll_y, self.get_max_scroll()))
+        if scroll_y == self.scroll_y:
+            return
+        self.scroll_y = scroll_y
+        if self.up_index is not None:
+            self.update_rows()
+
+    def get_row_pitch(self):
+        return self.get_row_h() + self.indent
+
+    def get_row_h(self):
+        return (self.rect.h - 3 * self.indent - self.title_label.h) //\
             self.n_vizible - self.indent
-        for i, el in enumerate(elements):
-            item, info = el
-            self.elements.append(ScrollElement(self,
-                                               (0, 0, self.w - self.indent * 2,
-                                                h), item, button=button,
-                                               information=info,
-                                               select_func=self.select_func))
-        self.up_index = None if elements == [] else 0
-        self.selected_index = None if elements == [] else self.selected_index
+
+    def get_view_rect(self):
+        return pg.Rect(self.indent, 2 * self.indent + self.title_label.h,
+                       self.rect.w - 2 * self.indent,
+                       self.n_vizible * self.get_row_pitch() - self.indent)
+
+    def get_max_scroll(self):
+        return max(0, (len(self.model) - self.n_vizible) *
+                   self.get_row_pitch())
+
+    def set_elements(self, elements, button=None):
+        if button is not self.button:
+            self.rows = []
+            self.button = button
+        self.scroll_y = 0
+        self.model.set_elements(elements)
+
+    def set_model(self, model):
+        self.cancel_filter()
+        if self.model is not None:
+            self.model.remove_listener(self.view_changed)
+        self.model = model
+        self.model.add_listener(self.view_changed)
+        self.scroll_y = 0
+        self.selected_source = None
+        self.view_changed()
+
+    def get_model(self):
+        return self.model
+
+    def set_filter(self, text, mode=ListModel.SUBSTRING):
+        # The search is a task of the window, so a long list is filtered
+        # over a few frames, and the next keystroke drops the search begun
+        # for the previous one
+        self.cancel_filter()
+        self.filter_task = self.get_window().start_task(
+            self.model.filter_steps(text, mode), callback=self.filter_done)
+
+    def filter_done(self, result):
+        self.filter_task = None
+        self.set_scroll(0)
+
+    def cancel_filter(self):
+        if self.filter_task is not None:
+            self.filter_task.cancel()
+            self.filter_task = None
+
+    def set_sort(self, key=None, reverse=False):
+        self.scroll_y = 0
+        self.model.set_sort(key, reverse)
+
+    def view_changed(self):
+        # Only the rows in view exist as widgets, one more for a partly
+        # scrolled row, they are rebound to the data on scrolling
+        n_rows = min(self.n_vizible + 1, len(self.model))
+        while len(self.rows) < n_rows:
+            item, info = self.model[len(self.rows)]
+            self.rows.append(ScrollElement(self,
+                                           (0, 0,
+                                            self.rect.w - self.indent * 2,
+                                            self.get_row_h()), item,
+                                           button=self.button,
+                                           information=info,
+                                           select_func=self.select_func))
+        del self.rows[n_rows:]
+        # The selection follows its element through filtering and sorting
+        self.selected_index = self.model.get_view_index(self.selected_source)
+        self.speed = 0
+        self.scroll_y = max(0, min(self.scroll_y, self.get_max_scroll()))
+        self.up_index = None if not len(self.model) else 0
+        self.invalidate()
+        if self.up_index is not None:
+            self.update_rows()
+
+    def update_rows(self):
+        pitch = self.get_row_pitch()
+        x, y = self.indent, 2 * self.indent + self.title_label.h
+        self.up_index = int(self.scroll_y // pitch)
+        self.binding = True
+        # Every element keeps its row while it is in view, so scrolling
+        # rebinds only the rows which come into view
+        for index in range(self.up_index, self.up_index + len(self.rows)):
+            row = self.rows[index % len(self.rows)]
+            if index < len(self.model):
+                item, info = self.model[index]
+                key = (row.text, row.information, row.number, row.selected)
+                row.set_item(item, info)
+                row.set_number(index + 1)
+                row.set_selected(index == self.get_selected_item_index())
+                if key != (row.text, row.information, row.number,
+                           row.selected):
+                    self.changed_rows.add(row)
+            row.set_coords(x, y + index * pitch - round(self.scroll_y))
+        self.binding = False
+        self.mark_dirty()
+
+    def child_changed(self, widget):
+        if self.binding:
+            return
+        if widget in self.rows:
+            self.changed_rows.add(widget)
+        else:
+            self.surface = None
+        self.mark_dirty()
+
+    def invalidate(self):
+        self.surface = None
+        self.mark_dirty()
+
+    def set_selected_index(self, index):
+        self.selected_index = index
+        self.selected_source = self.model.get_source_index(index)
+        if self.up_index is not None:
+            self.update_rows()
+        else:
+            self.mark_dirty()
 
     def get_selected_item_info(self):
         if self.get_selected_item_index() is None:
             return
-        return self.elements[self.get_selected_item_index()].get_info()
+        return self.model[self.get_selected_item_index()][1]
 
     def get_selected_item_index(self):
         # Защита от удаления элементов:
         if self.selected_index is not None and\
-                        self.selected_index >= len(self.elements):
+                        self.selected_index >= len(self.model):
             self.selected_index = None
         return self.selected_index
 
 
 class ScrollElement(BaseWidget):
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION)
+    __slots__ = ('text', 'font_size', 'information', 'button',
+                 'select_function', 'main_color', 'current_color',
+                 'light_main_color', 'back_color', 'indent', 'rects_w',
+                 'bord_rad', 'number', 'selected', 'item_label', 'num_label',
+                 'surface', 'redraw')
+
     def __init__(self, parent, rect, text_item, font_size=35,
                  button=None, main_color=pg.Color(245, 127, 17),
                  back_color=pg.Color(20, 20, 20), information=None,
@@ -231,48 +485,66 @@ class ScrollElement(BaseWidget):
         self.bord_rad = 0
         self.number = 1
         self.selected = False
+        # The row is kept while it is recycled for other elements, and its
+        # content is drawn again only when the item, number or colors change
+        self.surface = None
+        self.redraw = True
 
-        item_w = self.w - self.h - self.indent * 2
+        item_w = self.rect.w - self.rect.h - self.indent * 2
         if self.button is not None:
-            item_w -= self.h + self.indent * 2
-            self.button.set_coords(self.h + self.indent * 3 + item_w,
+            item_w -= self.rect.h + self.indent * 2
+            self.button.set_coords(self.rect.h + self.indent * 3 + item_w,
                                    self.indent)
-            self.button.set_w(self.h - self.indent * 2)
-            self.button.set_h(self.h - self.indent * 2)
-        self.item_label = Label(self, (self.h + 2 * self.indent, self.indent,
-                                       item_w, self.h - self.indent * 2),
+            self.button.set_w(self.rect.h - self.indent * 2)
+            self.button.set_h(self.rect.h - self.indent * 2)
+        self.item_label = Label(self, (self.rect.h + 2 * self.indent,
+                                       self.indent, item_w,
+                                       self.rect.h - self.indent * 2),
                                 self.text, main_color=self.current_color,
                                  back_color=self.back_color,
                                 font_size=self.font_size)
         self.num_label = Label(self, (self.indent, self.indent,
-                                      self.h - self.indent * 2,
-                                      self.h - self.indent * 2),
+                                      self.rect.h - self.indent * 2,
+                                      self.rect.h - self.indent * 2),
                                 str(self.number),
                                 main_color=self.current_color,
                                 back_color=self.back_color,
-                                alignment=HorAlign.CENTER,
+                                alignment=Align.CENTER,
                                 font_size=self.font_size)
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
-        dr.rect(screen, self.back_color, (self.x, self.y, self.w, self.h),
-                border_radius=self.bord_rad)
-        dr.rect(screen, self.current_color, (self.x, self.y, self.w, self.h),
-                width=self.rects_w, border_radius=self.bord_rad)
-
-        surface = pg.Surface((self.w, self.h), pg.SRCALPHA, 32)
+        screen.blit(get_chrome(self.rect.size, self.back_color,
+                               self.current_color, self.rects_w,
+                               self.bord_rad), self.rect.topleft)
+
+        if self.surface is None or self.surface.get_size() != self.rect.size:
+            self.surface = pg.Surface(self.rect.size, pg.SRCALPHA, 32)
+            self.redraw = True
+        if self.redraw:
+            self.render_content(self.surface)
+            self.redraw = False
+        screen.blit(self.surface, self.rect.topleft)
+
+    def render_content(self, surface):
         surface.fill(pg.Color(0, 0, 0, 1))
-        dr.ellipse(surface, self.current_color, (self.indent, self.indent,
-                                                 self.h - self.indent * 2,
-                                                 self.h - self.indent * 2),
-                   width=self.rects_w)
+        number_size = (self.rect.h - self.indent * 2,
+                       self.rect.h - self.indent * 2)
+        surface.blit(get_chrome(number_size, None, self.current_color,
+                                self.rects_w, ellipse=True),
+                     (self.indent, self.indent))
         self.num_label.render(surface)
         self.item_label.render(surface)
         if self.button is not None:
             self.button.render(surface)
-        pg.Surface.blit(screen, surface, (self.x, self.y))
+
+    def child_changed(self, widget):
+        self.redraw = True
+        self.mark_dirty()
 
     def set_selected(self, bool_obj):
+        if bool_obj == self.selected:
+            return
         self.selected = bool_obj
         color = self.light_main_color if self.selected\
             else self.main_color
@@ -283,24 +555,343 @@ class ScrollElement(BaseWidget):
     def get_info(self):
         return self.information
 
+    def set_item(self, text_item, information=None):
+        self.information = information
+        if text_item == self.text:
+            return
+        self.text = text_item
+        self.item_label.set_text(self.text, self.font_size)
+
     def set_number(self, num):
+        if num == self.number:
+            return
         self.number = num
-        self.num_label.set_text(str(self.number))
+        self.num_label.set_text(str(self.number), self.font_size)
 
     def process_event(self, event, *args, **kwargs):
         if event.type == pg.MOUSEBUTTONDOWN:
             if self.parent.trans_pos(event.pos) in self and event.button == 1:
-                self.parent.selected_index = self.number - 1
+                self.parent.set_selected_index(self.number - 1)
                 self.select_function()
         if self.button is None:
             return
         if event.type == pg.MOUSEMOTION:
             if self.trans_pos(self.parent.trans_pos(event.pos)) in self.button:
-                self.button.current_image = self.button.light_image
+                image = self.button.light_image
             else:
-                self.button.current_image = self.button.image
+                image = self.button.image
+            if image is not self.button.current_image:
+                self.button.current_image = image
+                self.child_changed(self.button)
         if event.type == pg.MOUSEBUTTONDOWN:
             if self.trans_pos(self.parent.trans_pos(event.pos)) in\
                     self.button and event.button == 1:
-                self.button.slot()
+                self.button.call_slot()
                 raise ElementFunctionAtCycle
+
+
+class TextEdit(EditorMixin, BaseWidget):
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.KEYDOWN, pg.MOUSEWHEEL)
+    __slots__ = ('indent', 'border_w', 'light_delta', 'cursor_period',
+                 'blink_timer', 'tab_size', 'font_size', 'font', 'line_h',
+                 'current_color', 'main_color', 'light_main_color',
+                 'back_color', 'lines', 'caret', 'anchor', 'top_line',
+                 'scroll_x', 'line_surfaces', 'line_offsets', 'active',
+                 'draw_cursor')
+
+    def __init__(self, parent, rect, text='', font_size=24,
+                 color=pg.Color(222, 18, 178), back_color=pg.Color(0, 0, 0),
+                 cursor_period=30, tab_size=4, max_cached_lines=256):
+        super().__init__(parent, rect)
+        self.indent = 5
+        self.border_w = 2
+        self.light_delta = 90
+        # Cursor (cursor_period is counted in frames of 60 fps):
+        self.cursor_period = cursor_period
+        self.blink_timer = None
+        self.tab_size = tab_size
+
+        self.font_size = font_size
+        self.font = get_font(self.font_size)
+        self.line_h = self.font.get_linesize()
+
+        self.current_color = self.main_color = color
+        self.light_main_color = get_light_color(self.main_color,
+                                                self.light_delta)
+        self.back_color = back_color
+
+        # Text model: the lines are kept in a gap buffer, so a line is
+        # found by its number at once and an edit changes only its lines.
+        # Positions are (line, column) pairs
+        self.lines = GapBuffer([''])
+        self.caret = (0, 0)
+        self.anchor = None
+        self.top_line = 0
+        self.scroll_x = 0
+        # Only visible lines are rendered and measured, both are cached by
+        # the line text, so scrolling back and typing reuse them
+        self.line_surfaces = LRUCache(max_cached_lines)
+        self.line_offsets = LRUCache(max_cached_lines)
+
+        self.active = False
+        self.draw_cursor = False
+        self.set_text(text)
+
+    def process_event(self, event, *args, **kwargs):
+        if event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
+            if event.pos in self:
+                self.set_active(True)
+                self.set_caret(self.get_position_at(event.pos),
+                               pg.key.get_mods() & pg.KMOD_SHIFT)
+            else:
+                self.set_active(False)
+        if event.type == pg.MOUSEWHEEL:
+            if pg.mouse.get_pos() in self:
+                self.scroll(-event.y * 3)
+        if event.type == pg.KEYDOWN and self.active:
+            self.process_key(event)
+
+    def process_key(self, event):
+        shift = event.mod & pg.KMOD_SHIFT
+        ctrl = event.mod & pg.KMOD_CTRL
+        line, column = self.caret
+        if event.key == pg.K_LEFT:
+            self.set_caret(self.get_moved(self.caret, -1), shift)
+        elif event.key == pg.K_RIGHT:
+            self.set_caret(self.get_moved(self.caret, 1), shift)
+        elif event.key == pg.K_UP:
+            self.set_caret((line - 1, column), shift)
+        elif event.key == pg.K_DOWN:
+            self.set_caret((line + 1, column), shift)
+        elif event.key == pg.K_PAGEUP:
+            self.set_caret((line - self.get_page_size(), column), shift)
+        elif event.key == pg.K_PAGEDOWN:
+            self.set_caret((line + self.get_page_size(), column), shift)
+        elif event.key == pg.K_HOME:
+            self.set_caret((0 if ctrl else line, 0), shift)
+        elif event.key == pg.K_END:
+            line = len(self.lines) - 1 if ctrl else line
+            self.set_caret((line, len(self.lines[line])), shift)
+        elif event.key in (pg.K_RETURN, pg.K_KP_ENTER):
+            self.insert_text('\n')
+        elif event.key == pg.K_TAB:
+            self.insert_text(' ' * self.tab_size)
+        else:
+            self.process_edit_key(event)
+
+    def render(self, screen=None):
+        screen = screen if screen is not None else self.parent.screen
+        screen.blit(get_chrome(self.rect.size, self.back_color,
+                               self.current_color, self.border_w), self.rect)
+        inner = self.get_inner_rect()
+        clip = screen.get_clip()
+        screen.set_clip(inner.clip(clip))
+        x = inner.x - self.scroll_x
+        selection = self.get_selection()
+        end = min(len(self.lines), self.top_line + self.get_visible_count())
+        for line in range(self.top_line, end):
+            y = inner.y + (line - self.top_line) * self.line_h
+            text = self.lines[line]
+            if selection is not None and\
+                    selection[0][0] <= line <= selection[1][0]:
+                self.render_selection(screen, line, x, y, selection)
+            elif text:
+                screen.blit(self.get_line_surface(text), (x, y))
+        line, column = self.caret
+        if self.active and self.draw_cursor and self.top_line <= line < end:
+            cursor_x = x + self.get_offsets(self.lines[line])[column]
+            y = inner.y + (line - self.top_line) * self.line_h
+            dr.line(screen, self.current_color, (cursor_x, y),
+                    (cursor_x, y + self.line_h), self.border_w)
+        screen.set_clip(clip)
+
+    def render_selection(self, screen, line, x, y, selection):
+        text = self.lines[line]
+        offsets = self.get_offsets(text)
+        (start_line, start), (end_line, end) = selection
+        start = start if line == start_line else 0
+        end = end if line == end_line else len(text)
+        # The selected line end is shown as a space
+        tail = get_glyph_advance(' ', self.font_size)\
+            if line != end_line else 0
+        dr.rect(screen, self.current_color,
+                (x + offsets[start], y,
+                 offsets[end] - offsets[start] + tail, self.line_h))
+        if text:
+            screen.blit(self.get_line_surface(text), (x, y))
+        if start < end:
+            screen.blit(self.font.render(text[start:end], True,
+                                         self.back_color),
+                        (x + offsets[start], y))
+
+    def get_line_surface(self, text):
+        surface = self.line_surfaces.get(text)
+        if surface is None:
+            surface = self.font.render(text, True, self.current_color)
+            self.line_surfaces.put(text, surface)
+        return surface
+
+    def get_offsets(self, text):
+        # offsets[i] is the x of the caret standing before the i-th symbol
+        offsets = self.line_offsets.get(text)
+        if offsets is None:
+            offsets = list(accumulate((get_glyph_advance(symbol,
+                                                         self.font_size)
+                                       for symbol in text), initial=0))
+            self.line_offsets.put(text, offsets)
+        return offsets
+
+    def shift_offsets(self, old_line, line, start, end, text):
+        # Typing in a line measures only the new symbols, the offsets after
+        # them are moved
+        offsets = self.line_offsets.get(old_line)
+        if offsets is None:
+            return
+        new_offsets = offsets[:start + 1]
+        new_offsets.extend(islice(accumulate(
+            (get_glyph_advance(symbol, self.font_size) for symbol in text),
+            initial=new_offsets[-1]), 1, None))
+        delta = new_offsets[-1] - offsets[end]
+        new_offsets.extend(x + delta for x in offsets[end + 1:])
+        self.line_offsets.put(line, new_offsets)
+
+    def set_active(self, active):
+        if active != self.active:
+            # The cached lines are drawn in the other color
+            self.line_surfaces.clear()
+        super().set_active(active)
+
+    def get_text(self):
+        return '\n'.join(self.lines)
+
+    def set_text(self, text):
+        self.lines.set_items(self.get_clean_lines(text))
+        self.anchor = None
+        self.top_line = 0
+        self.set_caret((0, 0))
+
+    def get_line(self, index):
+        return self.lines[index]
+
+    def get_lines_count(self):
+        return len(self.lines)
+
+    def get_clean_lines(self, text):
+        text = text.replace('\r\n', '\n').replace('\r', '\n')\
+            .replace('\t', ' ' * self.tab_size)
+        return [line if line.isprintable() else
+                ''.join(symbol for symbol in line if symbol.isprintable())
+                for line in text.split('\n')]
+
+    def replace(self, start, end, text):
+        last = self.lines[end[0]][end[1]:]
+        lines = (self.lines[start[0]][:start[1]] + text + last).split('\n')
+        if start[0] == end[0] and len(lines) == 1:
+            self.shift_offsets(self.lines[start[0]], lines[0], start[1],
+                               end[1], text)
+        self.lines.replace(start[0], end[0] + 1, lines)
+        self.anchor = None
+        self.set_caret((start[0] + len(lines) - 1, len(lines[-1]) - len(last)))
+
+    def insert_text(self, text):
+        text = '\n'.join(self.get_clean_lines(text))
+        start, end = self.get_selection() or (self.caret, self.caret)
+        if text or start != end:
+            self.replace(start, end, text)
+
+    def delete(self, direction=-1):
+        selection = self.get_selection()
+        if selection is not None:
+            self.replace(*selection, '')
+            return
+        position = self.get_moved(self.caret, direction)
+        if position < self.caret:
+            self.replace(position, self.caret, '')
+        elif position > self.caret:
+            self.replace(self.caret, position, '')
+
+    def get_moved(self, position, delta):
+        line, column = position
+        column += delta
+        if column < 0 and line > 0:
+            return line - 1, len(self.lines[line - 1])
+        if column > len(self.lines[line]) and line < len(self.lines) - 1:
+            return line + 1, 0
+        return line, max(0, min(column, len(self.lines[line])))
+
+    def set_caret(self, position, select=False):
+        line = max(0, min(position[0], len(self.lines) - 1))
+        position = line, max(0, min(position[1], len(self.lines[line])))
+        if not select:
+            self.anchor = None
+        elif self.anchor is None:
+            self.anchor = self.caret
+        self.caret = position
+        if self.anchor == self.caret:
+            self.anchor = None
+        self.scroll_to_caret()
+        self.restart_blink()
+        self.mark_dirty()
+
+    def scroll_to_caret(self):
+        line, column = self.caret
+        page = self.get_page_size()
+        if line < self.top_line:
+            self.top_line = line
+        elif line >= self.top_line + page:
+            self.top_line = line - page + 1
+        inner_w = self.rect.w - 2 * self.indent - self.border_w
+        caret_x = self.get_offsets(self.lines[line])[column]
+        if caret_x < self.scroll_x:
+            self.scroll_x = caret_x
+        elif caret_x > self.scroll_x + inner_w:
+            self.scroll_x = caret_x - inner_w
+
+    def scroll(self, lines):
+        top_line = max(0, min(self.top_line + lines,
+                              len(self.lines) - self.get_page_size()))
+        if top_line != self.top_line:
+            self.top_line = top_line
+            self.mark_dirty()
+
+    def select_all(self):
+        self.set_caret((0, 0))
+        self.set_caret((len(self.lines) - 1, len(self.lines[-1])), True)
+
+    def get_selection(self):
+        if self.anchor is None:
+            return
+        return min(self.anchor, self.caret), max(self.anchor, self.caret)
+
+    def get_selected_text(self):
+        selection = self.get_selection()
+        if selection is None:
+            return ''
+        (start_line, start), (end_line, end) = selection
+        if start_line == end_line:
+            return self.lines[start_line][start:end]
+        return '\n'.join([self.lines[start_line][start:]] +
+                         self.lines.get_range(start_line + 1, end_line) +
+                         [self.lines[end_line][:end]])
+
+    def get_position_at(self, pos):
+        inner = self.get_inner_rect()
+        line = max(0, min(self.top_line + (pos[1] - inner.y) // self.line_h,
+                          len(self.lines) - 1))
+        offsets = self.get_offsets(self.lines[line])
+        x = pos[0] - inner.x + self.scroll_x
+        column = bisect_left(offsets, x)
+        if column > 0 and (column == len(offsets) or
+                           x - offsets[column - 1] < offsets[column] - x):
+            column -= 1
+        return line, column
+
+    def get_page_size(self):
+        # Lines fully visible in the widget
+        return max(1, self.get_inner_rect().h // self.line_h)
+
+    def get_visible_count(self):
+        return -(-self.get_inner_rect().h // self.line_h)
+
+    def get_inner_rect(self):
+        return self.rect.inflate(-2 * self.indent, -2 * self.indent)
@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame as pg
+
+from caches import LRUCache
+
+
+class AssetManager:
+    def __init__(self, max_images=128, workers=4):
+        self.images = LRUCache(max_images)
+        # Preloaded images wait here for the first load_image, so the ones
+        # never asked for are dropped like any other cached image
+        self.decoded = LRUCache(max_images)
+        self.workers = workers
+        self.executor = None
+        self.pending = {}
+        self.load_times = {}
+        # Reentrant, as a done future runs its callback in the thread which
+        # adds the callback
+        self.lock = threading.RLock()
+
+    def load_image(self, name, color_key=None, shared=False):
+        key = (name, color_key if color_key is None or
+               isinstance(color_key, int) else tuple(color_key))
+        image = self.images.get(key)
+        if image is None:
+            image = self.prepare(self.get_decoded(name), color_key)
+            self.images.put(key, image)
+        return image if shared else image.copy()
+
+    def get_decoded(self, name):
+        with self.lock:
+            future = self.pending.pop(name, None)
+            image = self.decoded.data.pop(name, None)
+        if future is not None:
+            return future.result()
+        if image is not None:
+            return image
+        return self.decode(name)
+
+    def decode(self, name):
+        start = time.perf_counter()
+        try:
+            image = pg.image.load(name)
+        except pg.error as message:
+            raise SystemExit(message)
+        self.load_times[name] = time.perf_counter() - start
+        return image
+
+    def prepare(self, image, color_key):
+        # Conversion needs the display, so it's done here, in the main
+        # thread, and not while preloading
+        if color_key is not None:
+            image = image.convert()
+            color_key = image.get_at((0, 0)) if color_key == -1\
+                else color_key
+            image.set_colorkey(color_key)
+        else:
+            image = image.convert_alpha()
+        return image
+
+    def preload(self, *names):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers)
+        with self.lock:
+            for name in names:
+                if name not in self.pending and\
+                        name not in self.decoded and\
+                        not any(key[0] == name for key in self.images.data):
+                    future = self.executor.submit(self.decode, name)
+                    self.pending[name] = future
+                    future.add_done_callback(
+                        lambda future, name=name: self.loaded(name, future))
+
+    def loaded(self, name, future):
+        # A failed load stays pending to be raised by load_image
+        with self.lock:
+            if self.pending.get(name) is future and not future.cancelled()\
+                    and future.exception() is None:
+                del self.pending[name]
+                self.decoded.put(name, future.result())
+
+    def is_pending(self, name=None):
+        with self.lock:
+            if name is None:
+                return any(not future.done()
+                           for future in self.pending.values())
+            return name in self.pending and not self.pending[name].done()
+
+    def get_load_times(self):
+        return dict(self.load_times)
+
+    def get_stats(self):
+        stats = self.images.get_stats()
+        stats['pending'] = len(self.pending)
+        stats['decoded'] = len(self.decoded)
+        stats['load_time'] = sum(self.load_times.values())
+        return stats
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+            self.decoded.clear()
+        self.images.clear()
+        self.load_times.clear()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        # Cancelled images are loaded again when they are asked for
+        with self.lock:
+            for name, future in list(self.pending.items()):
+                if future.cancelled():
+                    del self.pending[name]
+
+
+asset_manager = AssetManager()
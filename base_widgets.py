@@ -1,29 +1,147 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from math import ceil
+from time import perf_counter
+
 import pygame as pg
 import pygame.draw as dr
 import pygame.sprite as spr
-import pygame.transform as tr
-import pygame.font as fnt
 
 from functions import do_nothing, get_width, load_image, get_max_font_size,\
-    get_coords_from_align, get_max_text_string, get_light_color
+    get_coords_from_align, get_max_text_string, get_light_color, get_font,\
+    get_text_size, merge_rects, get_glyph_advance, get_clipboard_text,\
+    set_clipboard_text, scale_image, preload_images, wait_for, get_chrome,\
+    stop_preloading
 from additional_classes import Align
+from caches import font_cache, chrome_cache
+from events import EventRouter, WidgetGroup, coalesce_motion
+from profiling import FrameStats
+from replay import EventRecorder
+from executors import SLOT_DONE, slot_executor, submit_slot, run_done_slots
+from scheduling import timers, TaskScheduler
 
 
-class BaseWidget(spr.Sprite):
+class BaseWidget:
     EVENT_PROCESSING = 'event'
     RENDER = 'render'
+    # Event types passed to process_event (None - all of them) and those
+    # of them which matter only when event.pos is inside the widget
+    EVENT_TYPES = None
+    HIT_EVENT_TYPES = ()
+
+    # Widgets aren't sprites, as Sprite would give each of them a __dict__
+    # and a set of groups. They keep the part of its protocol used by
+    # WidgetGroup, and the groups are a tuple, mostly of one or none
+    __slots__ = ('parent', 'rect', 'dirty', 'parent_layout', 'widget_groups',
+                 '__weakref__')
 
     def __init__(self, parent, rect):
-        super().__init__()
         self.parent = parent
-        x, y, w, h = rect
         self.rect = pg.Rect(*rect)
-        self.x, self.y, self.x1, self.y1 = x, y, x + w, y + h
-        self.w, self.h = w, h
+        self.dirty = True
+        self.parent_layout = None
+        self.widget_groups = ()
+
+    def add_internal(self, group):
+        self.widget_groups += (group,)
+
+    def remove_internal(self, group):
+        self.widget_groups = tuple(widget_group for widget_group
+                                   in self.widget_groups
+                                   if widget_group is not group)
+
+    def groups(self):
+        return list(self.widget_groups)
+
+    def alive(self):
+        return bool(self.widget_groups)
+
+    def kill(self):
+        for group in self.widget_groups:
+            group.remove(self)
+
+    # Coordinates are taken from the rect instead of being stored twice,
+    # and are changed through the setters, so widgets can react
+    @property
+    def x(self):
+        return self.rect.x
+
+    @x.setter
+    def x(self, x):
+        self.set_x(x)
+
+    @property
+    def y(self):
+        return self.rect.y
+
+    @y.setter
+    def y(self, y):
+        self.set_y(y)
+
+    @property
+    def x1(self):
+        return self.rect.right
+
+    @x1.setter
+    def x1(self, x1):
+        self.set_w(x1 - self.rect.x)
+
+    @property
+    def y1(self):
+        return self.rect.bottom
+
+    @y1.setter
+    def y1(self, y1):
+        self.set_h(y1 - self.rect.y)
+
+    @property
+    def w(self):
+        return self.rect.w
+
+    @w.setter
+    def w(self, w):
+        self.set_w(w)
+
+    @property
+    def h(self):
+        return self.rect.h
+
+    @h.setter
+    def h(self, h):
+        self.set_h(h)
 
     def render(self, screen=None):
         pass
 
+    def mark_dirty(self):
+        self.dirty = True
+        if isinstance(self.parent, BaseWidget):
+            self.parent.child_changed(self)
+
+    def child_changed(self, widget):
+        self.mark_dirty()
+
+    def get_window(self):
+        widget = self
+        while widget.parent is not None:
+            widget = widget.parent
+        return widget
+
+    def get_size_hint(self):
+        # The least size the content needs, layouts don't make it smaller
+        return 0, 0
+
+    def deactivate(self):
+        # The widget is removed or its window stops, so it drops the focus
+        # and its timers
+        pass
+
+    def update_geometry(self):
+        # The size hint has changed, so the layout measures it again
+        if self.parent_layout is not None:
+            self.parent_layout.invalidate()
+
     def __contains__(self, coords):
         return self.rect.collidepoint(coords)
 
@@ -46,87 +164,477 @@ class BaseWidget(spr.Sprite):
         if h is not None:
             self.set_h(h)
 
+    def set_coords(self, x, y):
+        self.set_rect(x, y)
+
+    def trans_pos(self, pos):
+        return pos[0] - self.rect.x, pos[1] - self.rect.y
+
     def set_x(self, x):
-        self.x = x
+        if x == self.rect.x:
+            return
         self.rect.x = x
-        self.x1 = self.x + self.w
+        self.mark_dirty()
 
     def set_y(self, y):
-        self.y = y
+        if y == self.rect.y:
+            return
         self.rect.y = y
-        self.y1 = self.y + self.h
+        self.mark_dirty()
 
     def set_w(self, w):
-        self.w = w
+        if w == self.rect.w:
+            return
         self.rect.w = w
-        self.x1 = self.x + w
+        self.mark_dirty()
 
     def set_h(self, h):
-        self.h = h
+        if h == self.rect.h:
+            return
         self.rect.h = h
-        self.y1 = self.y + h
+        self.mark_dirty()
 
 
 class Window(BaseWidget):
+    # Event types never blocked by the event filter
+    SERVICE_EVENT_TYPES = (pg.QUIT, pg.VIDEORESIZE, pg.VIDEOEXPOSE,
+                           pg.WINDOWEXPOSED, SLOT_DONE)
+    # Seconds between checks for input of an idle window in run_async
+    IDLE_POLL_INTERVAL = 1 / 60
+
     def __init__(self, width, height, caption='Window', logo_name=None,
-                 background_color=pg.Color(0, 0, 0), fps=60):
+                 background_color=pg.Color(0, 0, 0), fps=60,
+                 resizable=False):
         super().__init__(None, (0, 0, width, height))
-        self.size = (self.w, self.h)
+        self.size = self.rect.size
+        self.resizable = resizable
+        self.layout = None
         self.fps = fps
         self.caption = caption
         self.logo_name = logo_name
         self.background_color = background_color
 
         self.cursor_group = spr.Group()
-        self.widgets_group = spr.Group()
+        self.router = EventRouter()
+        self.widgets_group = WidgetGroup(self.router)
         self.cursor_name = None
         self.new_window_after_self = None
+        self.manager = None
+        self.preload_names = []
+
+        self.dirty_rendering = False
+        self.idle_mode = False
+        self.coalesce_motion = False
+        self.event_filter = False
+        self.allowed_types = set()
+        self.filter_version = None
+        self.render_pending = True
+        self.dirty_areas = []
+        self.widget_rects = {}
+        self.cursor_rect = None
+
+        self.stats = None
+        self.stats_file_name = None
+        self.hooks_time = 0
+        self.frame_times = {}
+        self.frame_end = 0
+        self.recorder = None
+        self.tasks = TaskScheduler()
+        self.task_budget = 0.004
 
         self.runned = False
         self.running = True
+        self.quitting = False
+        self.prepared = False
 
     def run(self):
+        # Next windows are run in a loop, so a chain of them doesn't grow
+        # the stack
+        window = self
+        while window is not None:
+            window.start()
+            while window.running:
+                window.run_frame()
+            window.finish()
+            window = window.new_window_after_self
+
+    async def run_async(self):
+        window = self
+        while window is not None:
+            await window.run_window_async()
+            window = window.new_window_after_self
+
+    async def run_window_async(self):
+        self.open()
+        if not self.prepared:
+            await wait_for(self.code_before_game_cycle())  # USER CODE
+        self.prepared = False
+        self.create_cursor()
+        self.frame_end = asyncio.get_running_loop().time()
+        while self.running:
+            await self.run_frame_async()
+        await wait_for(self.code_after_game_cycle())  # USER CODE
+        self.leave()
+        self.close()
+
+    def start(self, screen=None):
+        self.open(screen)
+        if not self.prepared:
+            self.code_before_game_cycle()  # USER CODE
+        self.prepared = False
+        self.create_cursor()
+
+    def prepare(self, screen=None):
+        # Runs the set up code before the window is shown, so switching to
+        # it later costs only activation
+        if self.prepared:
+            return
+        if self.preload_names:
+            preload_images(*self.preload_names)
+        self.screen = screen
+        self.code_before_game_cycle()  # USER CODE
+        self.prepared = True
+
+    def open(self, screen=None):
         self.runned = True
-        pg.init()
-        clock = pg.time.Clock()
+        if screen is None:
+            pg.init()
+            screen = pg.display.set_mode(self.size, pg.RESIZABLE
+                                         if self.resizable else 0)
+        self.clock = pg.time.Clock()
+        if self.preload_names:
+            preload_images(*self.preload_names)
+        self.activate(screen)
+
+    def activate(self, screen):
+        self.screen = screen
         pg.display.set_caption(self.caption)
-        self.screen = pg.display.set_mode(self.size)
         if self.logo_name is not None:
-            pg.display.set_icon(load_image(self.logo_name))
-        self.code_before_game_cycle()  # USER CODE
+            pg.display.set_icon(load_image(self.logo_name, shared=True))
+        if self.event_filter:
+            self.update_event_filter()
+        self.mark_dirty()
+
+    def create_cursor(self):
+        # A scene started again must not draw the old cursor too
+        self.cursor_group.empty()
         if self.cursor_name is not None:
             pg.mouse.set_visible(False)
             self.cursor = spr.Sprite(self.cursor_group)
-            self.cursor.image = load_image(self.cursor_name)
+            self.cursor.image = load_image(self.cursor_name, shared=True)
             self.cursor.rect = self.cursor.image.get_rect()
-        while self.running:
-            for event in pg.event.get():
-                self.widgets_group.update(BaseWidget.EVENT_PROCESSING,
-                                          event=event)
-                if event.type == pg.QUIT:
-                    self.running = False
-                    self.exit()
-                self.code_in_event_cycle(event)  # USER CODE
-                if event.type == pg.MOUSEMOTION and\
-                                self.cursor_name is not None:
-                    self.cursor.rect.topleft = event.pos
-            self.code_before_render()  # USER CODE
+
+    def run_frame(self):
+        start = perf_counter()
+        events = self.get_events()
+        waited = perf_counter() - start
+        for hook, args in self.run_frame_steps(events, start, waited):
+            hook(*args)  # USER CODE
+        point = perf_counter()
+        self.clock.tick(self.fps)
+        self.end_frame(point, waited)
+
+    async def run_frame_async(self):
+        start = perf_counter()
+        events = await self.get_events_async()
+        waited = perf_counter() - start
+        for hook, args in self.run_frame_steps(events, start, waited):
+            await wait_for(hook(*args))  # USER CODE
+        point = perf_counter()
+        await self.pace_frame()
+        self.end_frame(point, waited)
+
+    def run_frame_steps(self, events, start, waited):
+        # The frame up to the clock tick, shared by both loops. The user
+        # code is yielded with its arguments, so run_frame calls it and
+        # run_frame_async awaits it, and the time it takes is counted apart
+        times = self.frame_times = {}
+        self.hooks_time = 0
+        timers.run_due()
+        run_done_slots()
+        for event in events:
+            self.process_event(event)
+            yield from self.hook_step(self.code_in_event_cycle, event)
+        point = perf_counter()
+        times['events'] = point - start - waited - self.hooks_time
+        self.tasks.run(self.task_budget)
+        start, point = point, perf_counter()
+        times['tasks'] = point - start
+        yield from self.hook_step(self.code_before_render)
+        hooks_time = self.hooks_time
+        start = perf_counter()
+        self.render_widgets()
+        yield from self.hook_step(self.code_in_render)
+        self.render_cursor()
+        times['render'] = perf_counter() - start -\
+            (self.hooks_time - hooks_time)
+        yield from self.hook_step(self.code_after_render)
+        times['user_code'] = self.hooks_time
+
+    def hook_step(self, hook, *args):
+        start = perf_counter()
+        yield hook, args
+        self.hooks_time += perf_counter() - start
+
+    def end_frame(self, point, waited):
+        times = self.frame_times
+        start, point = point, perf_counter()
+        times['tick'] = point - start + waited
+        self.present()
+        if self.stats is not None:
+            times['present'] = perf_counter() - point
+            self.stats.add_frame(times)
+
+    async def pace_frame(self):
+        # Frames are paced by the asyncio loop, so other tasks run while
+        # the window waits for the next frame
+        if not self.fps:
+            await asyncio.sleep(0)
+        else:
+            loop = asyncio.get_running_loop()
+            self.frame_end += 1 / self.fps
+            delay = self.frame_end - loop.time()
+            if delay < 0:
+                self.frame_end, delay = loop.time(), 0
+            await asyncio.sleep(delay)
+        self.clock.tick()
+
+    def get_events(self):
+        if self.event_filter and self.filter_version != self.router.version:
+            self.update_event_filter()
+        if self.is_idle():
+            events = self.wait_events()
+        else:
+            events = pg.event.get()
+        return self.prepare_events(self.record_events(events))
+
+    async def get_events_async(self):
+        if self.event_filter and self.filter_version != self.router.version:
+            self.update_event_filter()
+        events = pg.event.get()
+        # Waiting for an event would block the asyncio loop, so an idle
+        # window polls for them until the nearest timer is due
+        while not events and self.is_idle():
+            timeout = timers.get_timeout()
+            if timeout is not None and timeout <= 0:
+                break
+            await asyncio.sleep(Window.IDLE_POLL_INTERVAL if timeout is None
+                                else min(timeout, Window.IDLE_POLL_INTERVAL))
+            events = pg.event.get()
+        return self.prepare_events(self.record_events(events))
+
+    def is_idle(self):
+        return self.idle_mode and not self.needs_render() and not self.tasks
+
+    def record_events(self, events):
+        if self.recorder is not None:
+            self.recorder.record(events)
+        return events
+
+    def prepare_events(self, events):
+        if self.coalesce_motion:
+            return coalesce_motion(events)
+        return events
+
+    def update_event_filter(self):
+        self.filter_version = self.router.version
+        if not self.runned:
+            return
+        event_types = self.router.get_event_types()
+        if not self.event_filter or event_types is None:
+            pg.event.set_allowed(None)
+            return
+        event_types |= self.allowed_types
+        event_types.update(Window.SERVICE_EVENT_TYPES)
+        if self.cursor_name is not None:
+            event_types.add(pg.MOUSEMOTION)
+        pg.event.set_blocked(None)
+        pg.event.set_allowed(list(event_types))
+
+    def wait_events(self):
+        # Nothing to redraw, so the window sleeps until an event comes or
+        # the nearest timer is due
+        timeout = timers.get_timeout()
+        if timeout is None:
+            event = pg.event.wait()
+        elif timeout > 0:
+            event = pg.event.wait(max(1, ceil(timeout * 1000)))
+        else:
+            return pg.event.get()
+        if event.type == pg.NOEVENT:
+            return []
+        return [event] + pg.event.get()
+
+    def needs_render(self):
+        return self.dirty or bool(self.dirty_areas) or self.render_pending
+
+    def process_event(self, event, *args, **kwargs):
+        self.router.dispatch(event, self.stats)
+        if event.type == pg.QUIT:
+            self.running = False
+            self.quitting = True
+            self.exit()
+        if event.type == pg.VIDEORESIZE:
+            self.resize(event.w, event.h)
+        if event.type == pg.MOUSEMOTION and self.cursor_name is not None:
+            self.cursor.rect.topleft = event.pos
+
+    def render_widgets(self):
+        if self.layout is not None:
+            # Resizes and changes of a frame are arranged only once
+            self.layout.arrange()
+        self.render_pending = False
+        if self.dirty_rendering:
+            self.render_dirty()
+        else:
             self.screen.fill(self.background_color)
-            self.widgets_group.update(BaseWidget.RENDER)
-            self.code_in_render()
-            if pg.mouse.get_focused() and self.cursor_name is not None:
-                self.cursor_group.draw(self.screen)
-            self.code_after_render()  # USER CODE
-            clock.tick(self.fps)
+            for widget in self.widgets_group.sprites():
+                self.render_widget(widget)
+
+    def render_widget(self, widget):
+        if self.stats is None:
+            widget.render()
+        else:
+            start = perf_counter()
+            widget.render()
+            self.stats.add_widget_time(widget, 'render',
+                                       perf_counter() - start)
+
+    def render_cursor(self):
+        if pg.mouse.get_focused() and self.cursor_name is not None:
+            self.cursor_group.draw(self.screen)
+
+    def present(self):
+        if self.dirty_rendering:
+            pg.display.update(self.dirty_areas)
+            self.dirty_areas = []
+        else:
             pg.display.flip()
+
+    def finish(self):
         self.code_after_game_cycle()  # USER CODE
+        self.leave()
+        self.close()
+
+    def leave(self):
+        if self.stats is not None and self.stats_file_name is not None:
+            self.stats.dump(self.stats_file_name)
+        if self.recorder is not None:
+            self.recorder.close()
+        # Tasks of a stopped scene would never run again
+        self.tasks.clear()
+        for widget in self.widgets_group.sprites():
+            widget.deactivate()
+
+    def close(self):
+        self.tasks.clear()
+        stop_preloading()
         pg.quit()
-        if self.new_window_after_self is not None:
-            self.new_window_after_self.run()
+        font_cache.clear()
+        chrome_cache.clear()
 
     def exit(self):
         pass
 
+    def child_changed(self, widget):
+        self.router.move(widget)
+        self.render_pending = True
+
+    def invalidate(self, rect=None):
+        if rect is None:
+            self.dirty = True
+        else:
+            self.dirty_areas.append(pg.Rect(rect))
+
+    def render_dirty(self):
+        widgets = self.widgets_group.sprites()
+        if self.dirty:
+            self.dirty = False
+            self.screen.fill(self.background_color)
+            for widget in widgets:
+                widget.dirty = False
+                self.render_widget(widget)
+                self.widget_rects[widget] = widget.rect.copy()
+            self.dirty_areas = [self.screen.get_rect()]
+            return
+        areas = self.dirty_areas
+        for widget in list(self.widget_rects):
+            if not self.widgets_group.has(widget):
+                areas.append(self.widget_rects.pop(widget))
+        for widget in widgets:
+            if widget.dirty:
+                if widget in self.widget_rects:
+                    areas.append(self.widget_rects[widget])
+                areas.append(widget.rect.copy())
+                self.widget_rects[widget] = widget.rect.copy()
+        if self.cursor_name is not None:
+            if self.cursor_rect is not None and\
+                    self.cursor_rect != self.cursor.rect:
+                areas.append(self.cursor_rect)
+                areas.append(self.cursor.rect.copy())
+            self.cursor_rect = self.cursor.rect.copy()
+        self.dirty_areas = merge_rects(areas)
+        # Only the invalidated areas are cleared, so every widget crossing
+        # one of them is redrawn inside it in the group order
+        for area in self.dirty_areas:
+            self.screen.set_clip(area)
+            self.screen.fill(self.background_color)
+            for widget in widgets:
+                if widget.rect.colliderect(area):
+                    widget.dirty = False
+                    self.render_widget(widget)
+        self.screen.set_clip(None)
+
+    def set_dirty_rendering(self, dirty_rendering):
+        self.dirty_rendering = dirty_rendering
+        self.dirty = True
+
+    def resize(self, width, height):
+        self.set_rect(w=width, h=height)
+        self.size = self.rect.size
+        if self.runned:
+            self.screen = pg.display.get_surface()
+        if self.layout is not None:
+            self.layout.set_geometry(self.rect)
+
+    def set_layout(self, layout):
+        self.layout = layout
+        if layout is not None:
+            layout.set_geometry(self.rect)
+            layout.invalidate()
+        self.mark_dirty()
+
+    def set_idle_mode(self, idle_mode):
+        # Sleeping between events needs to know what is changed, so the idle
+        # mode works only with the dirty rendering
+        self.idle_mode = idle_mode
+        if idle_mode:
+            self.set_dirty_rendering(True)
+
+    def set_motion_coalescing(self, coalesce_motion):
+        self.coalesce_motion = coalesce_motion
+
+    def set_event_filter(self, event_filter, *allowed_types):
+        # Events nobody subscribes to aren't even queued, allowed_types are
+        # those needed by code_in_event_cycle
+        self.event_filter = event_filter
+        self.allowed_types = set(allowed_types)
+        self.update_event_filter()
+
+    def set_profiling(self, profiling, file_name=None, history=600):
+        self.stats = FrameStats(history) if profiling else None
+        self.stats_file_name = file_name
+
+    def set_recording(self, recording, file_name='events.trace.gz'):
+        # The events got by the window are saved for EventReplayer
+        if self.recorder is not None:
+            self.recorder.close()
+        self.recorder = EventRecorder(file_name) if recording else None
+
+    def get_stats(self, count=10):
+        return self.stats.get_stats(count) if self.stats is not None\
+            else None
+
     def set_caption(self, caption):
         self.caption = caption
         if self.runned:
@@ -138,21 +646,31 @@ class Window(BaseWidget):
     def set_cursor(self, image_name):
         self.cursor_name = image_name
         if self.runned and self.cursor_name is not None:
-            pos = pg.mouse.get_pos()
-            self.cursor.kill()
-            self.cursor = spr.Sprite(self.cursor_group)
-            self.cursor.image = load_image(self.cursor_name)
-            self.cursor.rect = self.cursor.image.get_rect()
-            self.cursor.rect.topleft = pos
+            self.create_cursor()
+            self.cursor.rect.topleft = pg.mouse.get_pos()
+        if self.event_filter:
+            self.update_event_filter()
 
     def set_logo(self, image_name):
         self.logo_name = image_name
         if self.runned and self.logo_name is not None:
-            pg.display.set_icon(load_image(self.logo_name))
+            pg.display.set_icon(load_image(self.logo_name, shared=True))
 
     def set_fps(self, fps):
         self.fps = fps
 
+    def start_task(self, generator, priority=0, callback=None):
+        # The generator runs between frames, callback gets what it returns
+        return self.tasks.add(generator, priority, callback)
+
+    def set_task_budget(self, seconds):
+        self.task_budget = seconds
+
+    def preload(self, *image_names):
+        self.preload_names.extend(image_names)
+        if self.runned:
+            preload_images(*image_names)
+
     def add_widgets(self, *widgets):
         self.widgets_group.add(*widgets)
 
@@ -178,13 +696,75 @@ class Window(BaseWidget):
         pass
 
 
-class PushButton(BaseWidget):
+class SlotWidget(BaseWidget):
+    __slots__ = ('slot', 'executor', 'slot_callback', 'busy')
+
+    def __init__(self, parent, rect, slot=do_nothing, executor=None,
+                 slot_callback=None):
+        super().__init__(parent, rect)
+        self.slot = slot
+        self.executor = executor
+        self.slot_callback = slot_callback
+        self.busy = False
+
+    def call_slot(self, *args, **kwargs):
+        # Clicks are ignored until the running call is finished
+        if self.busy:
+            return
+        if asyncio.iscoroutinefunction(self.slot):
+            return self.start_coroutine(self.slot(*args, **kwargs))
+        if self.executor is None:
+            return self.slot(*args, **kwargs)
+        self.set_busy(True)
+        return submit_slot(self.executor, self.slot, self.slot_done, *args,
+                           **kwargs)
+
+    def start_coroutine(self, coroutine):
+        self.set_busy(True)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Without run_async the coroutine gets a loop of its own in a
+            # worker, so the frames go on while it runs
+            executor = self.executor if self.executor is not None\
+                else slot_executor
+            return submit_slot(executor, asyncio.run, self.slot_done,
+                               coroutine)
+        task = loop.create_task(coroutine)
+        task.add_done_callback(self.slot_done)
+        return task
+
+    def slot_done(self, future):
+        self.set_busy(False)
+        if self.slot_callback is not None:
+            self.slot_callback(future)
+
+    def set_busy(self, busy):
+        if busy != self.busy:
+            self.busy = busy
+            self.mark_dirty()
+
+    def set_slot(self, slot):
+        self.slot = slot
+
+    def set_executor(self, executor=slot_executor, slot_callback=None):
+        self.executor = executor
+        self.slot_callback = slot_callback
+
+
+class PushButton(SlotWidget):
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION, pg.KEYDOWN)
+    HIT_EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION)
+    __slots__ = ('border_w', 'light_delta', 'indent', 'main_color',
+                 'light_main_color', 'current_color', 'back_color', 'text',
+                 'font_size', 'alignment', 'key', 'modifier')
+
     def __init__(self, parent, rect, text, font_size=40,
                  main_color=pg.Color(70, 202, 232),
                  back_color=pg.Color(0, 0, 0), slot=do_nothing,
-                 key=None, modifier=None, alignment=Align.CENTER):
-        super().__init__(parent, rect)
-        self.slot = slot
+                 key=None, modifier=None, alignment=Align.CENTER,
+                 executor=None, slot_callback=None):
+        super().__init__(parent, rect, slot, executor, slot_callback)
         self.border_w = 2
         self.light_delta = 90
         self.indent = 5
@@ -196,9 +776,10 @@ class PushButton(BaseWidget):
         self.back_color = back_color
 
         self.text = text
-        self.font_size = font_size if font_size < self.h - 2 * self.indent\
-            else get_max_font_size(self.text, self.w - 2 * self.indent,
-                                   self.h - 2 * self.indent,
+        self.font_size = font_size\
+            if font_size < self.rect.h - 2 * self.indent\
+            else get_max_font_size(self.text, self.rect.w - 2 * self.indent,
+                                   self.rect.h - 2 * self.indent,
                                    font_size)
         self.alignment = alignment
 
@@ -207,46 +788,47 @@ class PushButton(BaseWidget):
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
-        dr.rect(screen, self.back_color,
-                (self.x, self.y, self.w, self.h))
-        dr.rect(screen, self.current_color,
-                (self.x, self.y, self.w, self.h), width=self.border_w)
-        font = fnt.Font(None, self.font_size)
-        text = font.render(self.text, True, self.current_color)
-        x, y = get_coords_from_align(self.alignment, self.w - 2 * self.indent,
-                                     self.h - 2 * self.indent,
+        color = get_light_color(self.main_color, -self.light_delta)\
+            if self.busy else self.current_color
+        screen.blit(get_chrome(self.rect.size, self.back_color, color,
+                               self.border_w), self.rect.topleft)
+        font = get_font(self.font_size)
+        text = font.render(self.text, True, color)
+        x, y = get_coords_from_align(self.alignment,
+                                     self.rect.w - 2 * self.indent,
+                                     self.rect.h - 2 * self.indent,
                                      text.get_width(), text.get_height(),
-                                     start_x=self.x + self.indent,
-                                     start_y=self.y + self.indent)
+                                     start_x=self.rect.x + self.indent,
+                                     start_y=self.rect.y + self.indent)
         screen.blit(text, (x, y))
 
     def process_event(self, event, *args, **kwargs):
         if event.type == pg.MOUSEBUTTONDOWN:
             if event.pos in self and event.button == 1:
-                self.slot(*args, **kwargs)
+                self.call_slot(*args, **kwargs)
         if event.type == pg.KEYDOWN and self.key is not None:
             if event.key == self.key:
                 if self.modifier is not None:
                     if event.mod & self.modifier:
-                        self.slot(*args, **kwargs)
+                        self.call_slot(*args, **kwargs)
                 else:
-                    self.slot(*args, **kwargs)
+                    self.call_slot(*args, **kwargs)
         if event.type == pg.MOUSEMOTION:
-            if event.pos in self:
-                self.current_color = self.light_main_color
-            else:
-                self.current_color = self.main_color
+            color = self.light_main_color if event.pos in self\
+                else self.main_color
+            if color != self.current_color:
+                self.current_color = color
+                self.mark_dirty()
 
     def set_color(self, color):
         self.main_color = self.current_color = color
         self.light_main_color = get_light_color(self.main_color,
                                                 self.light_delta)
-
-    def set_slot(self, slot):
-        self.slot = slot
+        self.mark_dirty()
 
     def set_text(self, text):
         self.text = text
+        self.mark_dirty()
 
     def set_light_delta(self, delta):
         self.light_delta = delta
@@ -255,29 +837,40 @@ class PushButton(BaseWidget):
     def set_indent(self, indent):
         self.indent = indent
         self.font_size = self.font_size\
-            if self.font_size < self.h - 2 * self.indent\
-            else get_max_font_size(self.text, self.w - 2 * self.indent,
+            if self.font_size < self.rect.h - 2 * self.indent\
+            else get_max_font_size(self.text, self.rect.w - 2 * self.indent,
+                                   self.rect.h - 2 * self.indent,
                                    self.font_size)
+        self.mark_dirty()
 
     def set_border(self, border_w):
         self.border_w = border_w
+        self.mark_dirty()
+
 
+class Image(SlotWidget):
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION, pg.KEYDOWN)
+    HIT_EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION)
+    __slots__ = ('border_w', 'light_delta', 'smooth', 'image', 'current_image',
+                 'light_image', 'key', 'modifier', 'main_color',
+                 'current_color', 'light_main_color')
 
-class Image(BaseWidget):
     def __init__(self, parent, rect, image,
                  border_color=None, light_image=None,
-                 key=None, modifier=None, slot=do_nothing):
-        super().__init__(parent, rect)
+                 key=None, modifier=None, slot=do_nothing, smooth=False,
+                 executor=None, slot_callback=None):
+        super().__init__(parent, rect, slot, executor, slot_callback)
         self.border_w = 2
         self.light_delta = 90
+        self.smooth = smooth
 
-        self.image = self.current_image = tr.scale(image, (self.w, self.h))
+        self.image = self.current_image = scale_image(image, self.rect.size,
+                                                      self.smooth)
         self.light_image = light_image if light_image is None\
-            else tr.scale(light_image, (self.w, self.h))
+            else scale_image(light_image, self.rect.size, self.smooth)
 
         self.key = key
         self.modifier = modifier
-        self.slot = slot
 
         self.main_color = self.current_color = border_color
         self.light_main_color = get_light_color(self.main_color,
@@ -286,48 +879,59 @@ class Image(BaseWidget):
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
-        pg.Surface.blit(screen, self.current_image, (self.x, self.y))
+        pg.Surface.blit(screen, self.current_image, self.rect.topleft)
         if self.current_color is not None:
-            dr.rect(screen, self.current_color,
-                    (self.x, self.y, self.w, self.h), width=self.border_w)
+            dr.rect(screen, self.current_color, self.rect,
+                    width=self.border_w)
 
     def process_event(self, event, *args, **kwargs):
         if event.type == pg.MOUSEBUTTONDOWN:
             if event.pos in self and event.button == 1:
-                self.slot(*args, **kwargs)
+                self.call_slot(*args, **kwargs)
         if event.type == pg.KEYDOWN and self.key is not None:
             if event.key == self.key:
                 if self.modifier is not None:
                     if event.mod & self.modifier:
-                        self.slot(*args, **kwargs)
+                        self.call_slot(*args, **kwargs)
                 else:
-                    self.slot(*args, **kwargs)
+                    self.call_slot(*args, **kwargs)
         if event.type == pg.MOUSEMOTION and self.light_image is not None:
             if event.pos in self:
-                self.current_image = self.light_image
-                self.current_color = self.light_main_color
+                self.set_current_image(self.light_image, self.light_main_color)
             else:
-                self.current_image = self.image
-                self.current_color = self.main_color
+                self.set_current_image(self.image, self.main_color)
+
+    def set_current_image(self, image, color):
+        if image is not self.current_image or color != self.current_color:
+            self.current_image = image
+            self.current_color = color
+            self.mark_dirty()
 
     def set_image(self, image):
-        self.image = self.current_image = tr.scale(image, (self.w, self.h))
+        self.image = self.current_image = scale_image(image, self.rect.size,
+                                                      self.smooth)
+        self.mark_dirty()
 
     def set_light_image(self, image):
         self.light_image = image if image is None\
-            else tr.scale(image, (self.w, self.h))
+            else scale_image(image, self.rect.size, self.smooth)
+        self.mark_dirty()
 
     def set_color(self, color=None):
         self.main_color = self.current_color = color
         self.light_main_color = get_light_color(self.main_color,
                                                 self.light_delta)\
             if self.main_color is not None else None
-
-    def set_slot(self, slot):
-        self.slot = slot
+        self.mark_dirty()
 
 
 class Label(BaseWidget):
+    EVENT_TYPES = ()
+    __slots__ = ('indent', 'text_indent', 'border_w', 'text_strings',
+                 'alignment', 'main_color', 'back_color', 'border', 'font_obj',
+                 'start_font_size', 'surface', 'font_size', 'font', 'text_h',
+                 'text_w')
+
     def __init__(self, parent, rect, text, main_color=pg.Color(247, 180, 10),
                  back_color=pg.Color(0, 0, 0), font_size=20, font_obj=None,
                  border=False, alignment=Align.LEFT & Align.TOP):
@@ -341,26 +945,26 @@ class Label(BaseWidget):
         self.back_color = back_color
         self.border = border
 
-        max_string = get_max_text_string(self.text_strings)
-        string_h = (self.h - 2 * self.indent - (len(self.text_strings) - 1) *
-                    self.text_indent) // len(self.text_strings)
-        self.font_size = get_max_font_size(max_string, self.w - 2 * self.indent,
-                                           string_h, font_size)
-        self.start_font_size = self.font_size
         self.font_obj = font_obj
-        self.font = fnt.Font(self.font_obj, self.start_font_size)
-
-        self.text_h = (len(self.text_strings) - 1) * self.text_indent +\
-                      len(self.text_strings) * self.font.size(max_string)[1]
-        self.text_w = self.font.size(max_string)[0]
+        self.start_font_size = font_size
+        self.surface = None
+        self.fit_text()
+        self.start_font_size = self.font_size
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
         if self.border:
             dr.rect(screen, self.back_color, self.rect)
             dr.rect(screen, self.main_color, self.rect, width=self.border_w)
-        self.surface = pg.Surface((self.text_w, self.text_h), pg.SRCALPHA, 32)
-        self.surface.fill(pg.Color(0, 0, 0, 1))
+        if self.surface is None:
+            self.surface = self.render_text()
+        x, y = self.get_text_coords()
+        pg.Surface.blit(screen, self.surface,
+                        (self.rect.x + x, self.rect.y + y))
+
+    def render_text(self):
+        surface = pg.Surface((self.text_w, self.text_h), pg.SRCALPHA, 32)
+        surface.fill(pg.Color(0, 0, 0, 1))
         x, y = 0, 0
         for text in self.text_strings:
             text = self.font.render(text, True, self.main_color)
@@ -368,44 +972,164 @@ class Label(BaseWidget):
                                            text.get_height(),
                                            text.get_width(), text.get_height(),
                                            start_x=x, start_y=y)
-            self.surface.blit(text, (x1, y1))
+            surface.blit(text, (x1, y1))
             y += self.text_indent + text.get_height()
-        x, y = self.get_text_coords()
-        pg.Surface.blit(screen, self.surface, (self.x + x, self.y + y))
+        return surface
 
-    def set_text(self, text):
-        self.text_strings = text.split('\n')
+    def fit_text(self):
         max_string = get_max_text_string(self.text_strings)
-        string_h = (self.h - 2 * self.indent - (len(self.text_strings) - 1) *
+        string_h = (self.rect.h - 2 * self.indent -
+                    (len(self.text_strings) - 1) *
                     self.text_indent) // len(self.text_strings)
-        self.font_size = get_max_font_size(max_string, self.w - 2 * self.indent,
-                                           string_h, self.start_font_size)
-        self.font = fnt.Font(self.font_obj, self.font_size)
+        self.font_size = get_max_font_size(max_string,
+                                           self.rect.w - 2 * self.indent,
+                                           string_h, self.start_font_size,
+                                           self.font_obj)
+        self.font = get_font(self.font_size, self.font_obj)
+        self.text_w, string_h = get_text_size(max_string, self.font_size,
+                                              self.font_obj)
         self.text_h = (len(self.text_strings) - 1) * self.text_indent +\
-                      len(self.text_strings) * self.font.size(max_string)[1]
-        self.text_w = self.font.size(max_string)[0]
+                      len(self.text_strings) * string_h
+        self.invalidate()
+
+    def invalidate(self):
+        self.surface = None
+        self.mark_dirty()
+
+    def set_text(self, text, f_size=None):
+        text_strings = text.split('\n')
+        f_size = f_size if f_size is not None else self.start_font_size
+        if text_strings == self.text_strings and\
+                f_size == self.start_font_size:
+            return
+        self.text_strings = text_strings
+        self.start_font_size = f_size
+        self.fit_text()
+        self.update_geometry()
 
     def set_color(self, color):
+        if color == self.main_color:
+            return
         self.main_color = color
+        self.invalidate()
 
     def set_font(self, f_size=None, f_obj=None):
-        self.start_font_size = f_size if f_size is not None\
-            else self.start_font_size
-        self.font_obj = f_obj if f_obj is not None else self.font_obj
-        self.set_text('\n'.join(self.text_strings))
+        f_size = f_size if f_size is not None else self.start_font_size
+        f_obj = f_obj if f_obj is not None else self.font_obj
+        if f_size == self.start_font_size and f_obj == self.font_obj:
+            return
+        self.start_font_size = f_size
+        self.font_obj = f_obj
+        self.fit_text()
+        self.update_geometry()
+
+    def set_rect(self, x=None, y=None, w=None, h=None):
+        # The text is fitted once for a new width and height together
+        size = self.rect.size
+        if x is not None:
+            self.set_x(x)
+        if y is not None:
+            self.set_y(y)
+        if w is not None:
+            BaseWidget.set_w(self, w)
+        if h is not None:
+            BaseWidget.set_h(self, h)
+        if self.rect.size != size:
+            self.fit_text()
+
+    def set_w(self, w):
+        if w != self.rect.w:
+            super().set_w(w)
+            self.fit_text()
+
+    def set_h(self, h):
+        if h != self.rect.h:
+            super().set_h(h)
+            self.fit_text()
+
+    def get_size_hint(self):
+        # The text at the font size given to the label
+        max_string = get_max_text_string(self.text_strings)
+        w, h = get_text_size(max_string, self.start_font_size, self.font_obj)
+        count = len(self.text_strings)
+        return w + 2 * self.indent,\
+            count * h + (count - 1) * self.text_indent + 2 * self.indent
 
     def get_text_size(self):
         return self.text_w, self.text_h
 
     def get_text_coords(self):
-        return get_coords_from_align(self.alignment, self.w - 2 * self.indent,
-                                     self.h - 2 * self.indent,
+        return get_coords_from_align(self.alignment,
+                                     self.rect.w - 2 * self.indent,
+                                     self.rect.h - 2 * self.indent,
                                      self.text_w, self.text_h,
                                      start_x=self.indent,
                                      start_y=self.indent)
 
 
-class LineEdit(BaseWidget):
+class EditorMixin:
+    # Activation, the caret blinking and the keys editing text the same way
+    # in LineEdit and TextEdit
+    __slots__ = ()
+
+    def set_active(self, active):
+        if active == self.active:
+            return
+        self.active = active
+        self.current_color = self.light_main_color if active else\
+            self.main_color
+        self.restart_blink()
+        self.mark_dirty()
+
+    def deactivate(self):
+        self.set_active(False)
+
+    def restart_blink(self):
+        if self.blink_timer is not None:
+            self.blink_timer.cancel()
+            self.blink_timer = None
+        self.draw_cursor = True
+        if self.active:
+            self.blink_timer = timers.call_later(self.cursor_period / 60,
+                                                 self.blink)
+
+    def blink(self):
+        self.draw_cursor = not self.draw_cursor
+        self.blink_timer = timers.call_later(self.cursor_period / 60,
+                                             self.blink)
+        self.mark_dirty()
+
+    def process_edit_key(self, event):
+        ctrl = event.mod & pg.KMOD_CTRL
+        if event.key == pg.K_BACKSPACE:
+            self.delete(-1)
+        elif event.key == pg.K_DELETE:
+            self.delete(1)
+        elif ctrl and event.key == pg.K_a:
+            self.select_all()
+        elif ctrl and event.key in (pg.K_c, pg.K_x):
+            if self.get_selection() is not None:
+                set_clipboard_text(self.get_selected_text())
+                if event.key == pg.K_x:
+                    self.delete(-1)
+        elif ctrl and event.key == pg.K_v:
+            self.insert_text(get_clipboard_text())
+        else:
+            symbol = event.unicode
+            if symbol and symbol.isprintable():
+                self.insert_text(symbol)
+
+
+class LineEdit(EditorMixin, BaseWidget):
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.KEYDOWN)
+    __slots__ = ('indent', 'border_w', 'light_delta', 'cursor_period',
+                 'blink_timer', 'start_font_size', 'font_size', 'font',
+                 'alignment', 'current_color', 'main_color',
+                 'light_main_color', 'back_color', 'text', 'advances',
+                 'offsets', 'shift_start', 'shift', 'caret', 'anchor',
+                 'scroll_x', 'text_surface', 'surface_key', 'active',
+                 'draw_cursor')
+
     def __init__(self, parent, rect, text='', font_size=40,
                  color=pg.Color(222, 18, 178), back_color=pg.Color(0, 0, 0),
                  alignment=Align.LEFT, cursor_period=30):
@@ -413,12 +1137,15 @@ class LineEdit(BaseWidget):
         self.indent = 5
         self.border_w = 2
         self.light_delta = 90
-        # Cursor:
-        self.delta = -1
-        self.start_cursor_period = self.cursor_period = cursor_period
+        # Cursor (cursor_period is counted in frames of 60 fps):
+        self.cursor_period = cursor_period
+        self.blink_timer = None
 
-        self.text = text
         self.start_font_size = font_size
+        self.font_size = get_max_font_size('', self.rect.w,
+                                           self.rect.h - 2 * self.indent,
+                                           self.start_font_size)
+        self.font = get_font(self.font_size)
         self.alignment = alignment
 
         self.current_color = self.main_color = color
@@ -426,54 +1153,214 @@ class LineEdit(BaseWidget):
                                                 self.light_delta)
         self.back_color = back_color
 
-        self.label = Label(self.parent, self.rect, self.text,
-                           self.current_color, font_size=self.start_font_size,
-                           alignment=self.alignment)
+        # Text model: offsets[i] is the x of the caret standing before the
+        # i-th symbol, so an edit re-measures only the symbols after it
+        self.text = ''
+        self.advances = []
+        self.offsets = [0]
+        # The offsets from shift_start on are short by shift. The shift of
+        # an edit is added here, not to all the offsets after it
+        self.shift_start = 1
+        self.shift = 0
+        self.caret = 0
+        self.anchor = None
+        self.scroll_x = 0
+        self.text_surface = None
+        self.surface_key = None
 
         self.active = False
         self.draw_cursor = False
-
+        self.set_text(text)
 
     def process_event(self, event, *args, **kwargs):
         if event.type == pg.MOUSEBUTTONDOWN:
             if event.pos in self and event.button == 1:
-                self.active = True
+                self.set_active(True)
+                self.set_caret(self.get_index_at(event.pos[0]),
+                               pg.key.get_mods() & pg.KMOD_SHIFT)
             elif event.pos not in self and event.button == 1:
-                self.active = False
-            self.current_color = self.light_main_color if self.active\
-                else self.main_color
-            self.label.set_color(self.current_color)
+                self.set_active(False)
         if event.type == pg.KEYDOWN and self.active:
-            if event.key == pg.K_BACKSPACE:
-                self.set_text(self.text[:-1])
-            else:
-                symbol = event.unicode
-                if symbol.isprintable():
-                    self.set_text(self.text + symbol)
+            self.process_key(event)
+
+    def process_key(self, event):
+        shift = event.mod & pg.KMOD_SHIFT
+        if event.key == pg.K_LEFT:
+            self.set_caret(self.caret - 1, shift)
+        elif event.key == pg.K_RIGHT:
+            self.set_caret(self.caret + 1, shift)
+        elif event.key == pg.K_HOME:
+            self.set_caret(0, shift)
+        elif event.key == pg.K_END:
+            self.set_caret(len(self.text), shift)
+        else:
+            self.process_edit_key(event)
 
     def render(self, screen=None):
         screen = screen if screen is not None else self.parent.screen
-        pg.draw.rect(screen, self.back_color, self.rect)
-        pg.draw.rect(screen, self.current_color, self.rect, self.border_w)
-        self.label.render()
-        text_width, text_height = self.label.get_text_size()
-        x, y = self.label.get_text_coords()
-        x += self.x
-        y += self.y
+        screen.blit(get_chrome(self.rect.size, self.back_color,
+                               self.current_color, self.border_w), self.rect)
+        x, y = self.get_text_coords()
+        start, end = self.get_visible_range()
+        if start < end:
+            clip = screen.get_clip()
+            screen.set_clip(self.get_inner_rect().clip(clip))
+            screen.blit(self.get_text_surface(start, end),
+                        (x + self.get_offset(start), y))
+            screen.set_clip(clip)
         if self.active and self.draw_cursor:
+            cursor_x = x + self.get_offset(self.caret)
             dr.line(screen, self.current_color,
-                    (x + text_width, y), (x + text_width, y + text_height),
+                    (cursor_x, y), (cursor_x, y + self.font.get_height()),
                     self.border_w)
-        self.cursor_period += self.delta
-        if self.cursor_period <= 0 or\
-                        self.cursor_period >= self.start_cursor_period:
-            self.draw_cursor = not self.draw_cursor
-            self.delta *= -1
+
+    def get_text_surface(self, start, end):
+        selection = self.get_selection()
+        key = (start, end, self.text[start:end], tuple(self.current_color),
+               selection)
+        if key == self.surface_key:
+            return self.text_surface
+        text = self.font.render(self.text[start:end], True,
+                                self.current_color)
+        if selection is not None:
+            sel_start, sel_end = max(selection[0], start),\
+                min(selection[1], end)
+            offset = self.get_offset
+            surface = pg.Surface((max(text.get_width(),
+                                      offset(end) - offset(start)),
+                                  text.get_height()), pg.SRCALPHA, 32)
+            if sel_start < sel_end:
+                sel_x = offset(sel_start) - offset(start)
+                dr.rect(surface, self.current_color,
+                        (sel_x, 0, offset(sel_end) - offset(sel_start),
+                         text.get_height()))
+                surface.blit(text, (0, 0))
+                surface.blit(self.font.render(self.text[sel_start:sel_end],
+                                              True, self.back_color),
+                             (sel_x, 0))
+            else:
+                surface.blit(text, (0, 0))
+            text = surface
+        self.text_surface, self.surface_key = text, key
+        return text
 
     def get_text(self):
         return self.text
 
     def set_text(self, text):
-        self.text = text
-        self.label.set_text(self.text)
-        self.label.set_font(self.start_font_size)
+        self.replace(0, len(self.text), text)
+
+    def replace(self, start, end, text):
+        self.text = self.text[:start] + text + self.text[end:]
+        advances = [get_glyph_advance(symbol, self.font_size)
+                    for symbol in text]
+        self.advances[start:end] = advances
+        offsets, shift_start, shift = self.offsets, self.shift_start,\
+            self.shift
+        # The shift is moved to the end of the edit, so typing at one place
+        # changes only the offsets of the typed symbols
+        if shift_start <= end:
+            offsets[shift_start:end + 1] = [
+                offset + shift for offset in offsets[shift_start:end + 1]]
+        elif shift:
+            offsets[end + 1:shift_start] = [
+                offset - shift for offset in offsets[end + 1:shift_start]]
+        inserted = list(accumulate(advances, initial=offsets[start]))
+        self.shift += inserted[-1] - offsets[end]
+        offsets[start:end + 1] = inserted
+        self.shift_start = start + len(text) + 1
+        self.anchor = None
+        self.set_caret(start + len(text))
+
+    def insert_text(self, text):
+        text = ''.join(symbol for symbol in text if symbol.isprintable())
+        start, end = self.get_selection() or (self.caret, self.caret)
+        if text or start != end:
+            self.replace(start, end, text)
+
+    def delete(self, direction=-1):
+        selection = self.get_selection()
+        if selection is not None:
+            self.replace(*selection, '')
+        elif direction < 0 and self.caret > 0:
+            self.replace(self.caret - 1, self.caret, '')
+        elif direction > 0 and self.caret < len(self.text):
+            self.replace(self.caret, self.caret + 1, '')
+
+    def set_caret(self, index, select=False):
+        index = max(0, min(index, len(self.text)))
+        if not select:
+            self.anchor = None
+        elif self.anchor is None:
+            self.anchor = self.caret
+        self.caret = index
+        if self.anchor == self.caret:
+            self.anchor = None
+        self.scroll_to_caret()
+        self.restart_blink()
+        self.mark_dirty()
+
+    def scroll_to_caret(self):
+        inner_w = self.rect.w - 2 * self.indent - self.border_w
+        caret_x = self.get_offset(self.caret)
+        if caret_x < self.scroll_x:
+            self.scroll_x = caret_x
+        elif caret_x > self.scroll_x + inner_w:
+            self.scroll_x = caret_x - inner_w
+        self.scroll_x = max(0, min(self.scroll_x,
+                                   self.get_offset(len(self.text)) - inner_w))
+
+    def select_all(self):
+        self.set_caret(0)
+        self.set_caret(len(self.text), True)
+
+    def get_selection(self):
+        if self.anchor is None:
+            return
+        return min(self.anchor, self.caret), max(self.anchor, self.caret)
+
+    def get_selected_text(self):
+        selection = self.get_selection()
+        return '' if selection is None else self.text[slice(*selection)]
+
+    def get_index_at(self, x):
+        x -= self.get_text_coords()[0]
+        index = self.find_offset(x)
+        if index > 0 and (index == len(self.offsets) or
+                          x - self.get_offset(index - 1) <
+                          self.get_offset(index) - x):
+            index -= 1
+        return index
+
+    def get_offset(self, index):
+        if index >= self.shift_start:
+            return self.offsets[index] + self.shift
+        return self.offsets[index]
+
+    def find_offset(self, x, search=bisect_left):
+        # The offsets before shift_start and after it are searched apart
+        offsets = self.offsets
+        index = search(offsets, x, 0, min(self.shift_start, len(offsets)))
+        if index == self.shift_start:
+            index = search(offsets, x - self.shift, index, len(offsets))
+        return index
+
+    def get_visible_range(self):
+        inner_w = self.rect.w - 2 * self.indent
+        start = max(0, self.find_offset(self.scroll_x, bisect_right) - 1)
+        end = min(len(self.text), self.find_offset(self.scroll_x + inner_w))
+        return start, end
+
+    def get_inner_rect(self):
+        return self.rect.inflate(-2 * self.indent, -2 * self.indent)
+
+    def get_text_coords(self):
+        inner_w = self.rect.w - 2 * self.indent
+        x, y = get_coords_from_align(self.alignment, inner_w,
+                                     self.rect.h - 2 * self.indent,
+                                     min(self.get_offset(len(self.text)),
+                                         inner_w),
+                                     self.font.get_height(),
+                                     start_x=self.rect.x + self.indent,
+                                     start_y=self.rect.y + self.indent)
+        return x - self.scroll_x, y
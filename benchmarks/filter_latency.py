@@ -0,0 +1,99 @@
+import argparse
+import gc
+import os
+import random
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base_widgets import Window
+from advanced_widgets import ScrollList
+
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'theta',
+         'kappa')
+
+
+class FilterWindow(Window):
+    def __init__(self, elements, budget):
+        super().__init__(800, 600, 'Filter latency', fps=0)
+        self.elements_count = elements
+        self.set_task_budget(budget)
+        self.use_tasks = False
+        self.query = None
+
+    def code_before_game_cycle(self):
+        self.scroll_list = ScrollList(self, (500, 0, 300, 600), 'List',
+                                      title_font_size=30)
+        self.add_widgets(self.scroll_list)
+        generator = random.Random(1)
+        self.scroll_list.set_elements([
+            ('{} {} {}'.format(generator.choice(WORDS),
+                               generator.choice(WORDS), i), i)
+            for i in range(self.elements_count)])
+
+    def code_before_render(self):
+        # The keystroke is handled in the frame, so its time is counted
+        if self.query is None:
+            return
+        if self.use_tasks:
+            self.scroll_list.set_filter(self.query)
+        else:
+            self.scroll_list.model.set_filter(self.query)
+        self.query = None
+
+
+def measure(elements, queries, tasks, budget):
+    gc.collect()
+    window = FilterWindow(elements, budget)
+    window.set_profiling(True, history=100000)
+    window.use_tasks = tasks
+    window.start()
+    scroll_list = window.scroll_list
+    window.run_frame()
+    window.stats.clear()
+    frames = 0
+    for query in queries:
+        # A keystroke each frame, the text typed and then erased
+        for end in list(range(1, len(query) + 1)) +\
+                list(range(len(query) - 1, -1, -1)):
+            window.query = query[:end]
+            window.run_frame()
+            frames += 1
+    while scroll_list.filter_task is not None:
+        window.run_frame()
+        frames += 1
+    stats = window.get_stats()
+    shown = len(scroll_list.model)
+    window.finish()
+    # The search is user code at once and a task otherwise
+    phase = stats['phases']['tasks' if tasks else 'user_code']
+    return (frames, stats['frame']['max'], stats['frame']['p95'],
+            phase['max'], shown)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Frame time while a long list is filtered as typed')
+    parser.add_argument('--elements', type=int, default=100000)
+    parser.add_argument('--budget', type=float, default=0.004)
+    parser.add_argument('--queries', nargs='*',
+                        default=['epsilon', 'kappa 7', 'ta', '123'])
+    args = parser.parse_args()
+
+    results = []
+    for tasks in (False, True):
+        frames, longest, p95, search, shown = measure(
+            args.elements, args.queries, tasks, args.budget)
+        results.append(shown)
+        print('{:<12} {:>6} frames, longest {:>8.2f} ms, p95 {:>8.2f} ms, '
+              'search longest {:>8.2f} ms'.format(
+                  'tasks' if tasks else 'at once', frames, longest * 1000,
+                  p95 * 1000, search * 1000))
+    assert results[0] == results[1], 'The filtered lists differ'
+    assert search <= args.budget * 2, 'A frame searched for {:.2f} ms'.format(
+        search * 1000)
+
+
+if __name__ == '__main__':
+    main()
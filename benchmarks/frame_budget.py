@@ -0,0 +1,112 @@
+import argparse
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base_widgets import Window, Label
+from advanced_widgets import ScrollList
+from scheduling import run_in_chunks
+
+
+class BuildWindow(Window):
+    def __init__(self, labels, elements, tasks, budget):
+        super().__init__(1280, 720, 'Frame budget', fps=0)
+        self.labels_count = labels
+        self.elements_count = elements
+        self.use_tasks = tasks
+        self.set_task_budget(budget)
+        self.done = 0
+
+    def code_before_game_cycle(self):
+        self.scroll_list = ScrollList(self, (1000, 0, 280, 720), 'List',
+                                      title_font_size=30)
+        self.add_widgets(self.scroll_list)
+        elements = (('Element {}'.format(i), i)
+                    for i in range(self.elements_count))
+        if self.use_tasks:
+            self.start_task(self.build_labels(), callback=self.task_done)
+            # A part takes half of the budget, so the step begun just before
+            # the deadline ends within one and a half budgets
+            self.start_task(run_in_chunks(elements,
+                                          self.scroll_list.model.extend,
+                                          budget=self.task_budget / 2),
+                            callback=self.task_done)
+        else:
+            for _ in self.build_labels():
+                pass
+            self.scroll_list.set_elements(list(elements))
+            self.done = 2
+
+    def build_labels(self):
+        for i in range(self.labels_count):
+            x, y = (i % 25) * 40, (i // 25) % 60 * 12
+            self.add_widgets(Label(self, (x, y, 40, 12), str(i)))
+            yield
+
+    def task_done(self, result):
+        self.done += 1
+
+
+class CollectionTimer:
+    # The longest frames are full collections of the garbage collector, not
+    # tasks, so their time is shown apart
+    def __init__(self):
+        self.start = 0
+        self.longest = 0
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self.start = time.perf_counter()
+        elif info['generation'] == 2:
+            self.longest = max(self.longest, time.perf_counter() - self.start)
+
+
+def measure(labels, elements, tasks, budget):
+    # Garbage of the previous run would be collected in the middle of this one
+    gc.collect()
+    collections = CollectionTimer()
+    gc.callbacks.append(collections)
+    window = BuildWindow(labels, elements, tasks, budget)
+    window.set_profiling(True, history=100000)
+    window.start()
+    frames = 0
+    while window.done < 2 or frames == 0:
+        window.run_frame()
+        frames += 1
+    stats = window.get_stats()
+    # The tasks of a frame overrun it when they take twice the budget
+    overruns = sum(seconds > budget * 2
+                   for seconds in window.stats.phases['tasks'])
+    window.finish()
+    gc.callbacks.remove(collections)
+    return (frames, stats['frame']['max'], stats['frame']['p95'],
+            stats['phases']['tasks']['max'], overruns, collections.longest)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Longest frame while a big UI is built')
+    parser.add_argument('--labels', type=int, default=2000)
+    parser.add_argument('--elements', type=int, default=200000)
+    parser.add_argument('--budget', type=float, default=0.004)
+    args = parser.parse_args()
+
+    for tasks in (False, True):
+        frames, longest, p95, longest_tasks, overruns, collection =\
+            measure(args.labels, args.elements, tasks, args.budget)
+        print('{:<12} {:>6} frames, longest {:>8.2f} ms, p95 {:>8.2f} ms, '
+              'tasks longest {:>8.2f} ms, {} overruns, full collection '
+              '{:>8.2f} ms'.format('tasks' if tasks else 'in one go',
+                                   frames, longest * 1000, p95 * 1000,
+                                   longest_tasks * 1000, overruns,
+                                   collection * 1000))
+    assert not overruns, '{} frames ran tasks for over {:.2f} ms'.format(
+        overruns, args.budget * 2000)
+
+
+if __name__ == '__main__':
+    main()
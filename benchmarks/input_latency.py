@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+
+from base_widgets import Window, PushButton, Label, LineEdit
+from advanced_widgets import ScrollList
+from replay import EventReplayer, load_trace
+
+
+class DemoWindow(Window):
+    def __init__(self):
+        super().__init__(800, 600, 'Input latency')
+
+    def code_before_game_cycle(self):
+        self.buttons = [PushButton(self, (10, 10 + i * 50, 150, 40),
+                                   'Button {}'.format(i), font_size=20)
+                        for i in range(5)]
+        self.line_edit = LineEdit(self, (200, 10, 300, 40), font_size=20)
+        self.label = Label(self, (200, 60, 300, 40), 'Typed: ')
+        self.scroll_list = ScrollList(self, (520, 10, 270, 580), 'List',
+                                      title_font_size=30)
+        self.scroll_list.set_elements([('Item {}'.format(i), i)
+                                       for i in range(1000)])
+        self.add_widgets(*self.buttons, self.line_edit, self.label,
+                         self.scroll_list)
+
+    def code_in_event_cycle(self, event):
+        if event.type == pg.KEYDOWN:
+            self.label.set_text('Typed: ' + self.line_edit.text[-20:])
+
+
+def make_trace(seconds=5, frame_time=1 / 60):
+    # Pointer runs over the buttons, clicks, types and scrolls the list
+    frames = []
+    for index in range(int(seconds / frame_time)):
+        time = index * frame_time
+        part = index % 120
+        if part < 40:
+            pos = (20 + part * 3, 20 + part * 6)
+            events = [pg.event.Event(pg.MOUSEMOTION, pos=pos, rel=(3, 6),
+                                     buttons=(0, 0, 0))]
+        elif part == 40:
+            events = [pg.event.Event(pg.MOUSEBUTTONDOWN, pos=(300, 30),
+                                     button=1),
+                      pg.event.Event(pg.MOUSEBUTTONUP, pos=(300, 30),
+                                     button=1)]
+        elif part < 80:
+            key = pg.K_a + part % 26
+            events = [pg.event.Event(pg.KEYDOWN, key=key, mod=0,
+                                     unicode=chr(ord('a') + part % 26),
+                                     scancode=0)]
+        elif part % 4 == 0:
+            events = [pg.event.Event(pg.MOUSEMOTION, pos=(600, 300),
+                                     rel=(1, 0), buttons=(0, 0, 0)),
+                      pg.event.Event(pg.MOUSEWHEEL, x=0, y=-1,
+                                     flipped=False)]
+        else:
+            continue
+        frames.append((round(time, 4), events))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay an event trace and report input latency')
+    parser.add_argument('--trace', help='trace saved by Window.set_recording'
+                                        ', a generated one by default')
+    parser.add_argument('--realtime', action='store_true',
+                        help='replay at the recorded speed instead of the '
+                             'maximum one')
+    parser.add_argument('--output', help='file for the JSON report')
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace is not None else make_trace()
+    report = EventReplayer(DemoWindow(), trace, args.realtime).run()
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+
+if __name__ == '__main__':
+    main()
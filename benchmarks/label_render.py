@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+
+from base_widgets import Label
+
+
+class Screen:
+    def __init__(self, screen):
+        self.screen = screen
+
+
+def make_labels(parent, count):
+    labels = []
+    for i in range(count):
+        x, y = (i % 20) * 40, (i // 20) * 12
+        labels.append(Label(parent, (x, y, 40, 24), 'Label {}'.format(i)))
+    return labels
+
+
+def measure(labels, frames, retained):
+    screen = labels[0].parent.screen
+    start = time.perf_counter()
+    for _ in range(frames):
+        screen.fill(pg.Color(0, 0, 0))
+        for label in labels:
+            if not retained:
+                label.invalidate()
+            label.render()
+    return (time.perf_counter() - start) / frames
+
+
+def main(count=1000, frames=50):
+    pg.init()
+    parent = Screen(pg.display.set_mode((800, 600)))
+    labels = make_labels(parent, count)
+    before = measure(labels, frames, retained=False)
+    after = measure(labels, frames, retained=True)
+    print('{} static labels, {} frames'.format(count, frames))
+    print('re-render every frame: {:.3f} ms/frame'.format(before * 1000))
+    print('retained surfaces:     {:.3f} ms/frame'.format(after * 1000))
+    pg.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+
+from base_widgets import Window
+from advanced_widgets import ScrollList
+from caches import font_cache, chrome_cache
+from run import SCREEN_SIZE, WIDGETS
+
+
+def clear_caches():
+    font_cache.clear()
+    chrome_cache.clear()
+    gc.collect()
+
+
+def measure(window, factory, count):
+    # Surfaces are allocated by SDL, so only the Python objects are counted,
+    # and the bounded caches filled by the new texts are left out
+    clear_caches()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    widgets = [factory(window, i) for i in range(count)]
+    clear_caches()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del widgets
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Python memory used by one widget')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--widgets', nargs='+', default=list(WIDGETS),
+                        choices=list(WIDGETS))
+    args = parser.parse_args()
+
+    pg.init()
+    window = Window(*SCREEN_SIZE)
+    window.screen = pg.display.set_mode(SCREEN_SIZE)
+    window.icon = pg.Surface((64, 64))
+    window.light_icon = pg.Surface((64, 64))
+    window.scroll_list = ScrollList(window, (0, 0, *SCREEN_SIZE), 'Parent')
+    for name in args.widgets:
+        print('{:<15} {:>10.0f} bytes/widget'.format(
+            name, measure(window, WIDGETS[name], args.count)))
+    pg.quit()
+
+
+if __name__ == '__main__':
+    main()
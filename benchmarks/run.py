@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+
+from base_widgets import Window, PushButton, Image, Label, LineEdit
+from advanced_widgets import TabWidget, ScrollList, ScrollElement, TextEdit
+from functions import get_max_font_size, get_text_size, get_max_text_string,\
+    get_coords_from_align, get_light_color, merge_rects, load_image
+from additional_classes import Align
+from caches import font_cache
+
+SCREEN_SIZE = (1280, 720)
+SCALES = (10, 100, 1000, 10000)
+
+
+def get_rect(index, w, h):
+    columns = SCREEN_SIZE[0] // w
+    rows = SCREEN_SIZE[1] // h
+    index %= columns * rows
+    return (index % columns) * w, (index // columns) * h, w, h
+
+
+def make_push_button(parent, index):
+    return PushButton(parent, get_rect(index, 80, 30),
+                      'Button {}'.format(index), font_size=20)
+
+
+def make_image(parent, index):
+    return Image(parent, get_rect(index, 32, 32), parent.icon,
+                 border_color=pg.Color(200, 200, 200),
+                 light_image=parent.light_icon)
+
+
+def make_label(parent, index):
+    return Label(parent, get_rect(index, 80, 30), 'Label {}'.format(index))
+
+
+def make_line_edit(parent, index):
+    return LineEdit(parent, get_rect(index, 120, 30),
+                    'Line edit {}'.format(index), font_size=20)
+
+
+def make_tab_widget(parent, index):
+    tab_widget = TabWidget(parent, get_rect(index, 120, 80), ['One', 'Two'],
+                           titles_h=20, title_font_size=16)
+    tab_widget.set_widgets([PushButton(tab_widget, (5, 5, 60, 20), 'Tab',
+                                       font_size=16)], 0)
+    return tab_widget
+
+
+def make_scroll_list(parent, index):
+    scroll_list = ScrollList(parent, get_rect(index, 120, 160), 'List',
+                             title_font_size=20, n_vizible=3)
+    scroll_list.set_elements([('Item {}'.format(i), i) for i in range(20)])
+    return scroll_list
+
+
+def make_scroll_element(parent, index):
+    x, y, w, h = get_rect(index, 120, 30)
+    element = ScrollElement(parent.scroll_list, (0, 0, w, h),
+                            'Element {}'.format(index), font_size=20)
+    element.set_coords(x, y)
+    return element
+
+
+def make_text_edit(parent, index):
+    return TextEdit(parent, get_rect(index, 200, 120),
+                    '\n'.join('Line {} of edit {}'.format(line, index)
+                              for line in range(20)), font_size=16)
+
+
+WIDGETS = {
+    'PushButton': make_push_button,
+    'Image': make_image,
+    'Label': make_label,
+    'LineEdit': make_line_edit,
+    'TabWidget': make_tab_widget,
+    'ScrollList': make_scroll_list,
+    'ScrollElement': make_scroll_element,
+    'TextEdit': make_text_edit,
+}
+
+
+def get_events():
+    return [pg.event.Event(pg.MOUSEMOTION, pos=(10, 10), rel=(1, 1),
+                           buttons=(0, 0, 0)),
+            pg.event.Event(pg.MOUSEMOTION, pos=(1000, 700), rel=(1, 1),
+                           buttons=(0, 0, 0)),
+            pg.event.Event(pg.MOUSEBUTTONDOWN, pos=(10, 10), button=1),
+            pg.event.Event(pg.KEYDOWN, key=pg.K_a, unicode='a', mod=0),
+            pg.event.Event(pg.MOUSEWHEEL, x=0, y=-1)]
+
+
+def make_functions(image_name):
+    strings = ['String number {}'.format(i) for i in range(10)]
+    return {
+        'get_max_font_size': lambda i: get_max_font_size(
+            'Text {}'.format(i % 100), 200, 40),
+        'get_text_size': lambda i: get_text_size('Text {}'.format(i % 100),
+                                                 30),
+        'get_max_text_string': lambda i: get_max_text_string(strings),
+        'get_coords_from_align': lambda i: get_coords_from_align(
+            Align.RIGHT & Align.BOTTOM, 200, 100, 50, 20),
+        'get_light_color': lambda i: get_light_color(pg.Color(10, 20, 30),
+                                                     90),
+        'merge_rects': lambda i: merge_rects([(0, 0, 10, 10), (5, 5, 10, 10),
+                                              (40, 40, 5, 5)]),
+        'load_image': lambda i: load_image(image_name),
+        'load_image_shared': lambda i: load_image(image_name, shared=True),
+    }
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        font_cache.clear()
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def bench_widget(window, name, factory, count, repeat, frames):
+    results = {}
+    seconds, widgets = measure(
+        lambda: [factory(window, i) for i in range(count)], repeat)
+    results['{}.construct[{}]'.format(name, count)] =\
+        {'value': seconds / count, 'unit': 's', 'better': 'lower'}
+
+    for widget in widgets:
+        widget.render(window.screen)
+    start = time.perf_counter()
+    for _ in range(frames):
+        window.screen.fill(window.background_color)
+        for widget in widgets:
+            widget.render(window.screen)
+    results['{}.render[{}]'.format(name, count)] =\
+        {'value': (time.perf_counter() - start) / frames, 'unit': 's',
+         'better': 'lower'}
+
+    events = get_events()
+    start = time.perf_counter()
+    for event in events:
+        for widget in widgets:
+            widget.process_event(event)
+    results['{}.events[{}]'.format(name, count)] =\
+        {'value': len(events) * count / (time.perf_counter() - start),
+         'unit': 'events/s', 'better': 'higher'}
+    return results
+
+
+def bench_function(name, func, count):
+    font_cache.clear()
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return {'functions.{}[{}]'.format(name, count):
+            {'value': (time.perf_counter() - start) / count, 'unit': 's',
+             'better': 'lower'}}
+
+
+def run(scales, widget_names, repeat, frames):
+    pg.init()
+    window = Window(*SCREEN_SIZE)
+    window.screen = pg.display.set_mode(SCREEN_SIZE)
+    window.icon = pg.Surface((64, 64))
+    window.icon.fill(pg.Color(70, 202, 232))
+    window.light_icon = pg.Surface((64, 64))
+    window.light_icon.fill(pg.Color(160, 255, 255))
+    window.scroll_list = ScrollList(window, (0, 0, *SCREEN_SIZE), 'Parent')
+
+    results = {}
+    for name in widget_names:
+        for count in scales:
+            results.update(bench_widget(window, name, WIDGETS[name], count,
+                                        repeat if count < 10000 else 1,
+                                        frames))
+            print('{} x {} done'.format(name, count), file=sys.stderr)
+    with tempfile.TemporaryDirectory() as directory:
+        image_name = os.path.join(directory, 'icon.png')
+        pg.image.save(window.icon, image_name)
+        for name, func in make_functions(image_name).items():
+            for count in scales:
+                results.update(bench_function(name, func, count))
+    pg.quit()
+    return {'meta': {'python': platform.python_version(),
+                     'pygame': pg.version.ver,
+                     'platform': platform.platform(),
+                     'scales': list(scales), 'repeat': repeat,
+                     'frames': frames},
+            'results': results}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, current in sorted(results['results'].items()):
+        if key not in baseline['results']:
+            continue
+        old = baseline['results'][key]['value']
+        new = current['value']
+        if not old or not new:
+            continue
+        ratio = new / old if current['better'] == 'lower' else old / new
+        mark = ''
+        if ratio > 1 + tolerance:
+            mark = ' REGRESSION'
+            regressions.append(key)
+        print('{:<45} {:>12.4g} -> {:>12.4g} {:<8} x{:.2f}{}'.format(
+            key, old, new, current['unit'], ratio, mark))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless widget benchmarks')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--widgets', nargs='+', default=list(WIDGETS),
+                        choices=list(WIDGETS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--frames', type=int, default=5)
+    parser.add_argument('--output', help='file for the JSON results')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown before a regression '
+                             'is reported')
+    args = parser.parse_args()
+
+    results = run(args.scales, args.widgets, args.repeat, args.frames)
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
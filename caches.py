@@ -0,0 +1,257 @@
+from collections import OrderedDict
+
+import pygame as pg
+import pygame.transform as tr
+
+
+class LRUCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.data), 'maxsize': self.maxsize}
+
+
+class FontCache:
+    def __init__(self, max_fonts=64, max_metrics=4096, max_fits=1024,
+                 max_glyphs=8192):
+        self.fonts = LRUCache(max_fonts)
+        self.metrics = LRUCache(max_metrics)
+        self.fits = LRUCache(max_fits)
+        self.glyphs = LRUCache(max_glyphs)
+
+    def get_font(self, font_obj, size):
+        key = (font_obj, size)
+        font = self.fonts.get(key)
+        if font is None:
+            if not pg.font.get_init():
+                pg.font.init()
+            font = pg.font.Font(font_obj, size)
+            self.fonts.put(key, font)
+        return font
+
+    def get_size(self, text, size, font_obj=None):
+        key = (font_obj, size, text)
+        text_size = self.metrics.get(key)
+        if text_size is None:
+            text_size = self.get_font(font_obj, size).size(text)
+            self.metrics.put(key, text_size)
+        return text_size
+
+    def get_advance(self, symbol, size, font_obj=None):
+        key = (font_obj, size, symbol)
+        advance = self.glyphs.get(key)
+        if advance is None:
+            font = self.get_font(font_obj, size)
+            metrics = font.metrics(symbol)[0]
+            advance = metrics[4] if metrics is not None\
+                else font.size(symbol)[0]
+            self.glyphs.put(key, advance)
+        return advance
+
+    def get_max_size(self, text, w, h, start_size, font_obj=None):
+        key = (font_obj, text, w, h, start_size)
+        size = self.fits.get(key)
+        if size is None:
+            # Text extents grow with the font size, so the largest fitting
+            # size can be found by bisection instead of a linear countdown
+            low, high = 1, start_size
+            while low < high:
+                middle = (low + high + 1) // 2
+                text_w, text_h = self.get_size(text, middle, font_obj)
+                if text_w < w and text_h < h:
+                    low = middle
+                else:
+                    high = middle - 1
+            size = low
+            self.fits.put(key, size)
+        return size
+
+    def clear(self):
+        # Font objects become invalid after pg.quit()
+        self.fonts.clear()
+        self.metrics.clear()
+        self.fits.clear()
+        self.glyphs.clear()
+
+    def get_stats(self):
+        return {'fonts': self.fonts.get_stats(),
+                'metrics': self.metrics.get_stats(),
+                'fits': self.fits.get_stats(),
+                'glyphs': self.glyphs.get_stats()}
+
+
+font_cache = FontCache()
+
+
+class ImageCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.data = OrderedDict()
+        # Entries of a source surface by its id, it is counted in the bytes
+        # once while any of them lives
+        self.sources = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_scaled(self, image, size, smooth=False):
+        size = (max(0, int(size[0])), max(0, int(size[1])))
+        key = (id(image), size, smooth)
+        entry = self.data.get(key)
+        # The source is kept in the entry, so its id can't be reused by
+        # another surface while the entry lives
+        if entry is not None and entry[0] is image:
+            self.hits += 1
+            self.data.move_to_end(key)
+            if not entry[2] and pg.display.get_surface() is not None:
+                self.bytes -= self.get_bytes(entry[1])
+                entry[1] = self.convert(entry[1])
+                entry[2] = True
+                self.bytes += self.get_bytes(entry[1])
+            return entry[1]
+        self.misses += 1
+        scaled = self.scale(image, size, smooth)
+        converted = pg.display.get_surface() is not None
+        if converted:
+            scaled = self.convert(scaled)
+        self.put(key, [image, scaled, converted])
+        return scaled
+
+    def scale(self, image, size, smooth):
+        if smooth and image.get_bitsize() in (24, 32):
+            return tr.smoothscale(image, size)
+        return tr.scale(image, size)
+
+    def convert(self, image):
+        if image.get_flags() & pg.SRCALPHA:
+            return image.convert_alpha()
+        return image.convert()
+
+    def put(self, key, entry):
+        if key in self.data:
+            self.remove(key)
+        self.data[key] = entry
+        self.bytes += self.get_bytes(entry[1])
+        if key[0] in self.sources:
+            self.sources[key[0]] += 1
+        else:
+            self.sources[key[0]] = 1
+            self.bytes += self.get_bytes(entry[0])
+        while self.bytes > self.max_bytes and len(self.data) > 1:
+            self.remove(next(iter(self.data)))
+
+    def remove(self, key):
+        image, scaled, converted = self.data.pop(key)
+        self.bytes -= self.get_bytes(scaled)
+        self.sources[key[0]] -= 1
+        if not self.sources[key[0]]:
+            del self.sources[key[0]]
+            self.bytes -= self.get_bytes(image)
+
+    def get_bytes(self, image):
+        return image.get_width() * image.get_height() * image.get_bytesize()
+
+    def clear(self):
+        self.data.clear()
+        self.sources.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.data), 'bytes': self.bytes,
+                'max_bytes': self.max_bytes}
+
+
+image_cache = ImageCache()
+
+
+class ChromeCache:
+    # Colors of the transparent parts, the first one unused by a chrome is
+    # taken
+    KEY_COLORS = ((255, 0, 255), (0, 255, 255), (255, 255, 0))
+
+    def __init__(self, max_chromes=512):
+        self.chromes = LRUCache(max_chromes)
+
+    def get_chrome(self, size, back_color=None, border_color=None,
+                   border_w=0, radius=0, ellipse=False):
+        key = (tuple(size), self.get_key(back_color),
+               self.get_key(border_color), border_w, radius, ellipse)
+        chrome = self.chromes.get(key)
+        if chrome is None:
+            chrome = self.render(size, back_color, border_color, border_w,
+                                 radius, ellipse)
+            self.chromes.put(key, chrome)
+        return chrome
+
+    def get_key(self, color):
+        return color if color is None else tuple(color)
+
+    def render(self, size, back_color, border_color, border_w, radius,
+               ellipse):
+        colors = {tuple(color)[:3] for color in (back_color, border_color)
+                  if color is not None}
+        key_color = next(color for color in self.KEY_COLORS
+                         if color not in colors)
+        chrome = pg.Surface(size)
+        chrome.fill(key_color)
+        rect = (0, 0, *size)
+        if ellipse:
+            if back_color is not None:
+                pg.draw.ellipse(chrome, back_color, rect)
+            if border_color is not None:
+                pg.draw.ellipse(chrome, border_color, rect,
+                                width=border_w)
+        else:
+            if back_color is not None:
+                pg.draw.rect(chrome, back_color, rect, border_radius=radius)
+            if border_color is not None:
+                pg.draw.rect(chrome, border_color, rect, width=border_w,
+                             border_radius=radius)
+        chrome.set_colorkey(key_color, pg.RLEACCEL)
+        if pg.display.get_surface() is not None:
+            chrome = chrome.convert()
+        return chrome
+
+    def clear(self):
+        self.chromes.clear()
+
+    def get_stats(self):
+        return self.chromes.get_stats()
+
+
+chrome_cache = ChromeCache()
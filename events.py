@@ -0,0 +1,169 @@
+from time import perf_counter
+
+import pygame as pg
+import pygame.sprite as spr
+
+
+class SpatialGrid:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.widget_cells = {}
+        self.widget_rects = {}
+
+    def get_cells(self, rect):
+        size = self.cell_size
+        xs = range(rect.left // size, (rect.right - 1) // size + 1)
+        ys = range(rect.top // size, (rect.bottom - 1) // size + 1)
+        return [(cx, cy) for cx in xs for cy in ys]
+
+    def insert(self, widget):
+        rect = widget.rect.copy()
+        cells = self.get_cells(rect) if rect.w > 0 and rect.h > 0 else []
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(widget)
+        self.widget_cells[widget] = cells
+        self.widget_rects[widget] = rect
+
+    def remove(self, widget):
+        for cell in self.widget_cells.pop(widget, []):
+            widgets = self.cells[cell]
+            widgets.discard(widget)
+            if not widgets:
+                del self.cells[cell]
+        self.widget_rects.pop(widget, None)
+
+    def move(self, widget):
+        if widget not in self.widget_rects or\
+                self.widget_rects[widget] == widget.rect:
+            return
+        self.remove(widget)
+        self.insert(widget)
+
+    def query(self, pos):
+        cell = (pos[0] // self.cell_size, pos[1] // self.cell_size)
+        return {widget for widget in self.cells.get(cell, ())
+                if widget.rect.collidepoint(pos)}
+
+
+class EventRouter:
+    def __init__(self, cell_size=64):
+        self.grid = SpatialGrid(cell_size)
+        self.order = {}
+        self.counter = 0
+        self.all_events = set()
+        self.subscribers = {}
+        self.hit_subscribers = {}
+        self.hovered = set()
+        self.version = 0
+
+    def add(self, widget):
+        if widget in self.order:
+            return
+        self.order[widget] = self.counter
+        self.counter += 1
+        self.version += 1
+        if widget.EVENT_TYPES is None:
+            self.all_events.add(widget)
+            return
+        for event_type in widget.EVENT_TYPES:
+            if event_type in widget.HIT_EVENT_TYPES:
+                self.hit_subscribers.setdefault(event_type, set()).add(widget)
+            else:
+                self.subscribers.setdefault(event_type, set()).add(widget)
+        if widget.HIT_EVENT_TYPES:
+            self.grid.insert(widget)
+
+    def remove(self, widget):
+        if self.order.pop(widget, None) is None:
+            return
+        self.version += 1
+        self.all_events.discard(widget)
+        self.hovered.discard(widget)
+        for widgets in list(self.subscribers.values()) +\
+                list(self.hit_subscribers.values()):
+            widgets.discard(widget)
+        self.grid.remove(widget)
+
+    def move(self, widget):
+        self.grid.move(widget)
+
+    def get_event_types(self):
+        if self.all_events:
+            return
+        return {event_type for subscribers in (self.subscribers,
+                                               self.hit_subscribers)
+                for event_type, widgets in subscribers.items() if widgets}
+
+    def get_receivers(self, event):
+        receivers = self.all_events | self.subscribers.get(event.type, set())
+        hit_widgets = self.hit_subscribers.get(event.type)
+        if hit_widgets:
+            hits = self.grid.query(event.pos) & hit_widgets
+            if event.type == pg.MOUSEMOTION:
+                # Widgets the pointer has just left still need the event to
+                # reset their hover state
+                receivers = receivers | hits | self.hovered
+                self.hovered = hits
+            else:
+                receivers = receivers | hits
+        return sorted(receivers, key=self.order.__getitem__)
+
+    def dispatch(self, event, stats=None):
+        if stats is None:
+            for widget in self.get_receivers(event):
+                widget.process_event(event)
+            return
+        for widget in self.get_receivers(event):
+            start = perf_counter()
+            widget.process_event(event)
+            stats.add_widget_time(widget, 'event', perf_counter() - start)
+
+
+def coalesce_motion(events):
+    # Only the last position of a run of motions matters for hovering, the
+    # movement is summed so rel stays right
+    coalesced = []
+    for event in events:
+        if event.type == pg.MOUSEMOTION and coalesced and\
+                coalesced[-1].type == pg.MOUSEMOTION:
+            last = coalesced[-1]
+            coalesced[-1] = pg.event.Event(
+                pg.MOUSEMOTION, event.dict,
+                rel=(last.rel[0] + event.rel[0], last.rel[1] + event.rel[1]))
+        else:
+            coalesced.append(event)
+    return coalesced
+
+
+class WidgetGroup(spr.Group):
+    # Group takes only Sprite objects for single ones, widgets are added
+    # and removed here
+    def __init__(self, router, *sprites):
+        self.router = router
+        super().__init__(*sprites)
+
+    def add(self, *widgets):
+        for widget in widgets:
+            if not self.has_internal(widget):
+                self.add_internal(widget)
+                widget.add_internal(self)
+
+    def remove(self, *widgets):
+        for widget in widgets:
+            if self.has_internal(widget):
+                self.remove_internal(widget)
+                widget.remove_internal(self)
+
+    def has(self, *widgets):
+        return bool(widgets) and all(self.has_internal(widget)
+                                     for widget in widgets)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.router.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.router.remove(sprite)
+        sprite.deactivate()
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
+
+import pygame as pg
+
+SLOT_DONE = pg.event.custom_type()
+# Finished slots with their callbacks, the main loop runs them each frame
+done_slots = SimpleQueue()
+
+
+class SlotExecutor:
+    def __init__(self, executor=None, workers=4):
+        self.executor = executor
+        self.workers = workers
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers)
+        return self.executor
+
+    # Any concurrent.futures executor can run slots, this one only starts
+    # its threads on the first call
+    def submit(self, function, *args, **kwargs):
+        return self.get_executor().submit(function, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+
+def submit_slot(executor, slot, callback=None, *args, **kwargs):
+    future = executor.submit(slot, *args, **kwargs)
+    # The callback is passed back to the main loop, so it runs there and
+    # not in a worker
+    future.add_done_callback(lambda done: post_slot_done(done, callback))
+    return future
+
+
+def post_slot_done(future, callback):
+    # The event only wakes a sleeping window up, so a full queue or a closed
+    # display can't lose the result
+    done_slots.put((future, callback))
+    try:
+        pg.event.post(pg.event.Event(SLOT_DONE))
+    except pg.error:
+        pass
+
+
+def run_done_slots():
+    while not done_slots.empty():
+        future, callback = done_slots.get()
+        if callback is not None:
+            callback(future)
+
+
+slot_executor = SlotExecutor()
@@ -1,26 +1,68 @@
+import inspect
+
 import pygame as pg
-from additional_classes import Align, NotAlignmentError
+from additional_classes import Alignment, NotAlignmentError
+from caches import font_cache, image_cache, chrome_cache
+from assets import asset_manager
 
 
-def load_image(name, color_key=None):
-    try:
-        image = pg.image.load(name)
-    except pg.error as message:
-        raise SystemExit(message)
-
-    if color_key is not None:
-        image = image.convert()
-        color_key = image.get_at((0, 0)) if color_key == -1 else color_key
-        image.set_colorkey(color_key)
-    else:
-        image = image.convert_alpha()
-    return image
+def load_image(name, color_key=None, shared=False):
+    # Decoded images are cached, each call gets its own copy to change.
+    # shared=True returns the cached surface itself, which must not be
+    # drawn on or recolored, as every other user of the image sees it
+    return asset_manager.load_image(name, color_key, shared)
+
+
+def preload_images(*names):
+    asset_manager.preload(*names)
+
+
+def stop_preloading():
+    asset_manager.shutdown()
 
 
 def do_nothing(*args, **kwargs):
     pass
 
 
+async def wait_for(result):
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+def get_clipboard_text():
+    try:
+        return pg.scrap.get_text()
+    except pg.error:
+        return ''
+
+
+def set_clipboard_text(text):
+    try:
+        pg.scrap.put_text(text)
+    except pg.error:
+        pass
+
+
+def scale_image(image, size, smooth=False):
+    return image_cache.get_scaled(image, size, smooth)
+
+
+def get_image_cache_stats():
+    return image_cache.get_stats()
+
+
+def get_chrome(size, back_color=None, border_color=None, border_w=0,
+               radius=0, ellipse=False):
+    return chrome_cache.get_chrome(size, back_color, border_color, border_w,
+                                   radius, ellipse)
+
+
+def get_chrome_cache_stats():
+    return chrome_cache.get_stats()
+
+
 def get_width(surface, height):
     return round(surface.get_size()[0] * (height / surface.get_size()[1]))
 
@@ -29,40 +71,61 @@ def get_height(surface, width):
     return round(surface.get_size()[1] * (width / surface.get_size()[0]))
 
 
-def get_max_font_size(text, w, h, start_font=200):
-    while True:
-        text_font = pg.font.Font(None, start_font)
-        text_sc = text_font.render(text, True, pg.Color(0, 0, 0))
-        if text_sc.get_width() < w and text_sc.get_height() < h:
-            return start_font
-        start_font -= 1
+def get_font(size, font_obj=None):
+    return font_cache.get_font(font_obj, size)
+
+
+def get_text_size(text, size, font_obj=None):
+    return font_cache.get_size(text, size, font_obj)
+
+
+def get_glyph_advance(symbol, size, font_obj=None):
+    return font_cache.get_advance(symbol, size, font_obj)
+
+
+def get_font_cache_stats():
+    return font_cache.get_stats()
+
+
+def get_max_font_size(text, w, h, start_font=200, font_obj=None):
+    return font_cache.get_max_size(text, w, h, start_font, font_obj)
 
 
 def get_coords_from_align(alignment, parent_w, parent_h, item_w, item_h,
                           start_x=0, start_y=0):
-    #print(alignment, alignment.aligns)
-    if alignment == Align.LEFT:
+    if not isinstance(alignment, Alignment):
+        raise NotAlignmentError('Argument is not an Align object')
+    if alignment.horizontal == Alignment.LEFT:
         x = 0
-    elif alignment == Align.RIGHT:
+    elif alignment.horizontal == Alignment.RIGHT:
         x = parent_w - item_w
-    elif alignment == Align.CENTER:
-        x = parent_w // 2 - item_w // 2
     else:
-        raise NotAlignmentError('Argument is not an Align object')
-    if alignment == Align.TOP:
+        x = parent_w // 2 - item_w // 2
+    if alignment.vertical == Alignment.TOP:
         y = 0
-    elif alignment == Align.BOTTOM:
+    elif alignment.vertical == Alignment.BOTTOM:
         y = parent_h - item_h
-    elif alignment == Align.CENTER:
-        y = parent_h // 2 - item_h // 2
     else:
-        raise NotAlignmentError('Argument is not an Align object')
+        y = parent_h // 2 - item_h // 2
     return start_x + x, start_y + y
 
 
 def get_max_text_string(strings):
-    return max(strings, key=lambda x:\
-        pg.font.Font(None, 50).size(x)[0])
+    return max(strings, key=lambda x: get_text_size(x, 50)[0])
+
+
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        rect = pg.Rect(rect)
+        if rect.w <= 0 or rect.h <= 0:
+            continue
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
 
 
 def get_light_color(color, delta):
@@ -0,0 +1,275 @@
+import pygame as pg
+
+from functions import get_coords_from_align
+
+
+def distribute(sizes, stretches, total):
+    sizes = list(sizes)
+    extra = total - sum(sizes)
+    stretch = sum(stretches)
+    if extra <= 0 or not stretch:
+        return sizes
+    # Parts are taken from the running total, so rounding never loses pixels
+    done = 0
+    for index, factor in enumerate(stretches):
+        if factor:
+            sizes[index] += extra * (done + factor) // stretch -\
+                extra * done // stretch
+            done += factor
+    return sizes
+
+
+class LayoutItem:
+    def __init__(self, item, stretch=0, alignment=None, size=None):
+        self.item = item
+        self.stretch = stretch
+        self.alignment = alignment
+        self.size = size
+
+    def get_size(self):
+        if isinstance(self.item, Layout):
+            return self.item.get_min_size()
+        if isinstance(self.item, Spacer):
+            return self.size
+        # The size given on adding is the least one, content may need more
+        hint_w, hint_h = self.item.get_size_hint()
+        return max(self.size[0], hint_w), max(self.size[1], hint_h)
+
+    def set_geometry(self, x, y, w, h):
+        if self.alignment is not None:
+            item_w, item_h = self.get_size()
+            item_w, item_h = min(item_w, w), min(item_h, h)
+            x, y = get_coords_from_align(self.alignment, w, h, item_w, item_h,
+                                         start_x=x, start_y=y)
+            w, h = item_w, item_h
+        if isinstance(self.item, Layout):
+            self.item.set_geometry((x, y, w, h))
+            self.item.arrange()
+        else:
+            self.item.set_rect(x, y, w, h)
+
+
+class Layout:
+    def __init__(self, rect=(0, 0, 0, 0), margin=0, spacing=0):
+        self.rect = pg.Rect(rect)
+        self.margin = margin
+        self.spacing = spacing
+        self.items = []
+        self.parent = None
+        # Sizes are measured and items are placed only after a change
+        self.min_size = None
+        self.dirty = True
+
+    def add_item(self, item):
+        self.items.append(item)
+        if isinstance(item.item, Layout):
+            item.item.parent = self
+        elif not isinstance(item.item, Spacer):
+            item.item.parent_layout = self
+        self.invalidate()
+        return item
+
+    def remove(self, item):
+        for layout_item in self.items:
+            if layout_item.item is item:
+                self.items.remove(layout_item)
+                if isinstance(item, Layout):
+                    item.parent = None
+                elif not isinstance(item, Spacer):
+                    item.parent_layout = None
+                self.invalidate()
+                return
+
+    def get_widgets(self):
+        widgets = []
+        for layout_item in self.items:
+            if isinstance(layout_item.item, Layout):
+                widgets.extend(layout_item.item.get_widgets())
+            elif not isinstance(layout_item.item, Spacer):
+                widgets.append(layout_item.item)
+        return widgets
+
+    def invalidate(self):
+        self.min_size = None
+        self.dirty = True
+        if self.parent is not None:
+            self.parent.invalidate()
+
+    def set_geometry(self, rect):
+        rect = pg.Rect(rect)
+        if rect != self.rect:
+            self.rect = rect
+            self.dirty = True
+
+    def set_margin(self, margin):
+        self.margin = margin
+        self.invalidate()
+
+    def set_spacing(self, spacing):
+        self.spacing = spacing
+        self.invalidate()
+
+    def get_min_size(self):
+        if self.min_size is None:
+            w, h = self.measure()
+            self.min_size = w + 2 * self.margin, h + 2 * self.margin
+        return self.min_size
+
+    def get_inner_rect(self):
+        return self.rect.inflate(-2 * self.margin, -2 * self.margin)
+
+    def arrange(self):
+        if not self.dirty:
+            return False
+        self.dirty = False
+        self.arrange_items(self.get_inner_rect())
+        return True
+
+    def measure(self):
+        return 0, 0
+
+    def arrange_items(self, rect):
+        pass
+
+
+class BoxLayout(Layout):
+    HORIZONTAL = 'horizontal'
+    VERTICAL = 'vertical'
+
+    def __init__(self, direction, rect=(0, 0, 0, 0), margin=0, spacing=0):
+        super().__init__(rect, margin, spacing)
+        self.direction = direction
+
+    def add_widget(self, widget, stretch=0, alignment=None):
+        return self.add_item(LayoutItem(widget, stretch, alignment,
+                                        (widget.w, widget.h)))
+
+    def add_layout(self, layout, stretch=0, alignment=None):
+        return self.add_item(LayoutItem(layout, stretch, alignment))
+
+    def add_spacing(self, size):
+        return self.add_item(LayoutItem(Spacer(), 0, None, (size, size)))
+
+    def add_stretch(self, stretch=1):
+        return self.add_item(LayoutItem(Spacer(), stretch, None, (0, 0)))
+
+    def measure(self):
+        sizes = [item.get_size() for item in self.items]
+        spacing = self.spacing * max(0, len(sizes) - 1)
+        if self.direction == BoxLayout.HORIZONTAL:
+            return sum(w for w, h in sizes) + spacing,\
+                max((h for w, h in sizes), default=0)
+        return max((w for w, h in sizes), default=0),\
+            sum(h for w, h in sizes) + spacing
+
+    def arrange_items(self, rect):
+        horizontal = self.direction == BoxLayout.HORIZONTAL
+        main = rect.w if horizontal else rect.h
+        sizes = [item.get_size()[0 if horizontal else 1]
+                 for item in self.items]
+        sizes = distribute(sizes, [item.stretch for item in self.items],
+                           main - self.spacing * max(0, len(sizes) - 1))
+        position = rect.x if horizontal else rect.y
+        for item, size in zip(self.items, sizes):
+            if horizontal:
+                item.set_geometry(position, rect.y, size, rect.h)
+            else:
+                item.set_geometry(rect.x, position, rect.w, size)
+            position += size + self.spacing
+
+
+class HBoxLayout(BoxLayout):
+    def __init__(self, rect=(0, 0, 0, 0), margin=0, spacing=0):
+        super().__init__(BoxLayout.HORIZONTAL, rect, margin, spacing)
+
+
+class VBoxLayout(BoxLayout):
+    def __init__(self, rect=(0, 0, 0, 0), margin=0, spacing=0):
+        super().__init__(BoxLayout.VERTICAL, rect, margin, spacing)
+
+
+class GridLayout(Layout):
+    def __init__(self, rect=(0, 0, 0, 0), margin=0, spacing=0):
+        super().__init__(rect, margin, spacing)
+        self.cells = {}
+        self.row_stretches = {}
+        self.column_stretches = {}
+
+    def add_widget(self, widget, row, column, row_span=1, column_span=1,
+                   alignment=None):
+        item = LayoutItem(widget, 0, alignment, (widget.w, widget.h))
+        self.cells[item] = (row, column, row_span, column_span)
+        return self.add_item(item)
+
+    def add_layout(self, layout, row, column, row_span=1, column_span=1,
+                   alignment=None):
+        item = LayoutItem(layout, 0, alignment)
+        self.cells[item] = (row, column, row_span, column_span)
+        return self.add_item(item)
+
+    def remove(self, item):
+        for layout_item in self.items:
+            if layout_item.item is item:
+                del self.cells[layout_item]
+        super().remove(item)
+
+    def set_row_stretch(self, row, stretch):
+        self.row_stretches[row] = stretch
+        self.invalidate()
+
+    def set_column_stretch(self, column, stretch):
+        self.column_stretches[column] = stretch
+        self.invalidate()
+
+    def get_tracks(self):
+        rows = max((row + span for row, column, span, column_span
+                    in self.cells.values()), default=0)
+        columns = max((column + span for row, column, row_span, span
+                       in self.cells.values()), default=0)
+        heights, widths = [0] * rows, [0] * columns
+        for item, (row, column, row_span, column_span) in self.cells.items():
+            w, h = item.get_size()
+            # A spanning item asks for an equal part of each track it spans
+            w = -(-(w - self.spacing * (column_span - 1)) // column_span)
+            h = -(-(h - self.spacing * (row_span - 1)) // row_span)
+            for index in range(column, column + column_span):
+                widths[index] = max(widths[index], w)
+            for index in range(row, row + row_span):
+                heights[index] = max(heights[index], h)
+        return widths, heights
+
+    def get_stretches(self, stretches, count):
+        # Without stretch factors all tracks grow equally
+        if not any(stretches.get(index, 0) for index in range(count)):
+            return [1] * count
+        return [stretches.get(index, 0) for index in range(count)]
+
+    def measure(self):
+        widths, heights = self.get_tracks()
+        return sum(widths) + self.spacing * max(0, len(widths) - 1),\
+            sum(heights) + self.spacing * max(0, len(heights) - 1)
+
+    def arrange_items(self, rect):
+        widths, heights = self.get_tracks()
+        widths = distribute(
+            widths, self.get_stretches(self.column_stretches, len(widths)),
+            rect.w - self.spacing * max(0, len(widths) - 1))
+        heights = distribute(
+            heights, self.get_stretches(self.row_stretches, len(heights)),
+            rect.h - self.spacing * max(0, len(heights) - 1))
+        xs = [rect.x]
+        for w in widths:
+            xs.append(xs[-1] + w + self.spacing)
+        ys = [rect.y]
+        for h in heights:
+            ys.append(ys[-1] + h + self.spacing)
+        for item, (row, column, row_span, column_span) in self.cells.items():
+            item.set_geometry(xs[column], ys[row],
+                              xs[column + column_span] - xs[column] -
+                              self.spacing,
+                              ys[row + row_span] - ys[row] - self.spacing)
+
+
+class Spacer:
+    def set_rect(self, x=None, y=None, w=None, h=None):
+        pass
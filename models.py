@@ -0,0 +1,327 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+from caches import LRUCache
+
+SEPARATOR = '\0'
+
+
+def run_steps(steps):
+    # Runs a generator made for a TaskScheduler at once, giving its result
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+class ListModel:
+    SUBSTRING = 'substring'
+    PREFIX = 'prefix'
+
+    def __init__(self, elements=(), max_results=64):
+        self.results = LRUCache(max_results)
+        self.listeners = []
+        self.filter_text = ''
+        self.filter_mode = ListModel.SUBSTRING
+        self.sort_key = None
+        self.sort_reverse = False
+        # Changed with the elements or the order, so a search running over
+        # several frames knows its result is out of date
+        self.version = 0
+        self.set_elements(elements)
+
+    def __len__(self):
+        return len(self.view)
+
+    def __getitem__(self, index):
+        return self.elements[self.view[index]]
+
+    def __iter__(self):
+        return (self.elements[index] for index in self.view)
+
+    def set_elements(self, elements):
+        self.elements = list(elements)
+        self.keys = [self.get_key(item) for item, info in self.elements]
+        self.invalidate()
+
+    def append(self, item, information=None):
+        self.extend([(item, information)])
+
+    def extend(self, elements):
+        start = len(self.elements)
+        for item, info in elements:
+            self.elements.append((item, info))
+            self.keys.append(self.get_key(item))
+        # The index and the order are extended, not rebuilt
+        keys = self.keys[start:]
+        if self.text is not None and keys:
+            self.text += SEPARATOR + SEPARATOR.join(keys)
+            self.starts.extend(accumulate((len(key) + 1 for key in keys),
+                                          initial=self.starts[-1]))
+            del self.starts[-len(keys) - 1]
+        if self.order is not None and self.sort_key is not None and\
+                not self.sort_reverse:
+            for index in range(start, len(self.elements)):
+                value = self.sort_key(self.elements[index])
+                position = bisect_right(self.order_values, value)
+                self.order_values.insert(position, value)
+                self.order.insert(position, index)
+        elif self.order is not None:
+            self.order = None
+        self.results.clear()
+        self.version += 1
+        if not self.filter_text and self.sort_key is None:
+            # Nothing hides or moves elements, so the view only grows. It
+            # keeps filling the model by parts from being quadratic
+            self.view.extend(range(start, len(self.elements)))
+            for listener in self.listeners:
+                listener()
+        else:
+            self.update_view()
+
+    def clear(self):
+        self.set_elements([])
+
+    def invalidate(self):
+        # The index is rebuilt on the first search which needs it
+        self.text = None
+        self.starts = None
+        self.order = None
+        self.order_values = None
+        self.results.clear()
+        self.version += 1
+        self.update_view()
+
+    def get_key(self, item):
+        return str(item).casefold()
+
+    def get_index(self):
+        # All keys are kept in one string, each after a separator, so both
+        # substring and prefix searches run in str.find
+        if self.text is None:
+            self.text = SEPARATOR + SEPARATOR.join(self.keys)
+            self.starts = list(accumulate((len(key) + 1 for key in self.keys),
+                                          initial=0))
+        return self.text, self.starts
+
+    def get_order(self):
+        if self.order is None:
+            order = list(range(len(self.elements)))
+            if self.sort_key is not None:
+                values = [self.sort_key(element) for element in self.elements]
+                order.sort(key=values.__getitem__, reverse=self.sort_reverse)
+                self.order_values = [values[index] for index in order]
+            self.order = order
+        return self.order
+
+    def set_filter(self, text, mode=SUBSTRING):
+        if text == self.filter_text and mode == self.filter_mode:
+            return
+        self.filter_text = text
+        self.filter_mode = mode
+        self.update_view()
+
+    def set_sort(self, key=None, reverse=False):
+        self.sort_key = key
+        self.sort_reverse = reverse
+        self.order = None
+        self.version += 1
+        self.update_view()
+
+    def filter_steps(self, text, mode=SUBSTRING, size=5000):
+        # set_filter for a TaskScheduler, the elements are looked through
+        # by parts of size. The view changes only at the end, so a search
+        # cancelled by the next keystroke leaves the model as it was
+        version = self.version
+        matches = yield from self.find_steps(text.casefold(), mode, size)
+        view = yield from self.view_steps(matches, size)
+        self.filter_text = text
+        self.filter_mode = mode
+        if self.version != version:
+            # The elements were changed while the search ran
+            self.update_view()
+        else:
+            self.set_view(view)
+
+    def find(self, text, mode=SUBSTRING):
+        text = text.casefold()
+        if not text:
+            return range(len(self.elements))
+        matches = self.results.get((mode, text))
+        if matches is None:
+            matches = self.search(text, mode)
+            self.results.put((mode, text), matches)
+        return matches
+
+    def search(self, text, mode):
+        keys = self.keys
+        # Typing only narrows the previous result, so it is filtered again
+        previous = self.results.get((mode, text[:-1]))
+        if previous is not None:
+            if mode == ListModel.PREFIX:
+                return [index for index in previous
+                        if keys[index].startswith(text)]
+            return [index for index in previous if text in keys[index]]
+        # A single symbol or very common text is looked up faster by a plain
+        # scan than through the index
+        if len(text) == 1 or self.count(text, mode) > len(keys) // 8:
+            if mode == ListModel.PREFIX:
+                return [index for index, key in enumerate(keys)
+                        if key.startswith(text)]
+            return [index for index, key in enumerate(keys) if text in key]
+        full_text, starts = self.get_index()
+        if mode == ListModel.PREFIX:
+            text = SEPARATOR + text
+        matches = []
+        position = full_text.find(text)
+        while position != -1:
+            index = bisect_right(starts, position) - 1
+            matches.append(index)
+            position = full_text.find(text, starts[index + 1])
+        return matches
+
+    def find_steps(self, text, mode, size):
+        if not text:
+            return range(len(self.elements))
+        matches = self.results.get((mode, text))
+        if matches is not None:
+            return matches
+        version = self.version
+        keys = self.keys
+        previous = self.results.get((mode, text[:-1]))
+        source = range(len(keys)) if previous is None else previous
+        matches = []
+        for start in range(0, len(source), size):
+            part = source[start:start + size]
+            if mode == ListModel.PREFIX:
+                matches.extend(index for index in part
+                               if keys[index].startswith(text))
+            else:
+                matches.extend(index for index in part if text in keys[index])
+            yield
+        if self.version == version:
+            self.results.put((mode, text), matches)
+        return matches
+
+    def count(self, text, mode):
+        full_text = self.get_index()[0]
+        if mode == ListModel.PREFIX:
+            return full_text.count(SEPARATOR + text)
+        return full_text.count(text)
+
+    def update_view(self):
+        matches = self.find(self.filter_text, self.filter_mode)
+        self.set_view(run_steps(self.view_steps(matches,
+                                                len(self.elements) + 1)))
+
+    def view_steps(self, matches, size):
+        if self.sort_key is None:
+            return list(matches)
+        order = self.get_order()
+        if len(matches) == len(self.elements):
+            return list(order)
+        chosen = set(matches)
+        view = []
+        for start in range(0, len(order), size):
+            view.extend(index for index in order[start:start + size]
+                        if index in chosen)
+            yield
+        return view
+
+    def set_view(self, view):
+        self.view = view
+        for listener in self.listeners:
+            listener()
+
+    def get_source_index(self, index):
+        if index is None or not 0 <= index < len(self.view):
+            return
+        return self.view[index]
+
+    def get_view_index(self, source_index):
+        if source_index is None:
+            return
+        try:
+            return self.view.index(source_index)
+        except ValueError:
+            return
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+
+class GapBuffer:
+    # The free space is kept at the place of the last edit, so typing and
+    # joining lines there only move the items between two edits
+    def __init__(self, items=(), gap_size=64):
+        self.gap_size = gap_size
+        self.set_items(items)
+
+    def __len__(self):
+        return len(self.items) - self.gap_end + self.gap_start
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('GapBuffer index out of range')
+        if index >= self.gap_start:
+            index += self.gap_end - self.gap_start
+        return self.items[index]
+
+    def __iter__(self):
+        yield from self.items[:self.gap_start]
+        yield from self.items[self.gap_end:]
+
+    def set_items(self, items):
+        self.items = list(items)
+        self.gap_start = len(self.items)
+        self.items.extend([None] * self.gap_size)
+        self.gap_end = len(self.items)
+
+    def get_range(self, start, end):
+        return [self[index] for index in range(start, end)]
+
+    def move_gap(self, index):
+        items = self.items
+        if index < self.gap_start:
+            count = self.gap_start - index
+            items[self.gap_end - count:self.gap_end] =\
+                items[index:self.gap_start]
+            # Only the moved out places left in the gap are cleared
+            clear_end = min(self.gap_start, self.gap_end - count)
+            items[index:clear_end] = [None] * (clear_end - index)
+            self.gap_start -= count
+            self.gap_end -= count
+        elif index > self.gap_start:
+            count = index - self.gap_start
+            items[self.gap_start:self.gap_start + count] =\
+                items[self.gap_end:self.gap_end + count]
+            clear_start = max(self.gap_end, self.gap_start + count)
+            items[clear_start:self.gap_end + count] =\
+                [None] * (self.gap_end + count - clear_start)
+            self.gap_start += count
+            self.gap_end += count
+
+    def replace(self, start, end, items):
+        self.move_gap(end)
+        self.items[start:self.gap_start] = [None] * (self.gap_start - start)
+        self.gap_start = start
+        if len(items) > self.gap_end - self.gap_start:
+            # The gap grows with the buffer, so inserts stay amortized O(1)
+            size = max(self.gap_size, len(self) // 2, len(items))
+            self.items[self.gap_end:self.gap_end] = [None] * size
+            self.gap_end += size
+        self.items[self.gap_start:self.gap_start + len(items)] = items
+        self.gap_start += len(items)
+
+    def insert(self, index, item):
+        self.replace(index, index, [item])
+
+    def delete(self, start, end):
+        self.replace(start, end, [])
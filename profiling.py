@@ -0,0 +1,83 @@
+import json
+from collections import deque
+from weakref import WeakKeyDictionary
+
+
+def get_percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def get_summary(values):
+    return {'mean': sum(values) / len(values) if values else 0,
+            'p50': get_percentile(values, 50),
+            'p95': get_percentile(values, 95),
+            'p99': get_percentile(values, 99),
+            'max': max(values, default=0)}
+
+
+class FrameStats:
+    PHASES = ('events', 'tasks', 'user_code', 'render', 'tick', 'present')
+
+    def __init__(self, history=600):
+        self.history = history
+        self.frames = deque(maxlen=history)
+        self.phases = {phase: deque(maxlen=history) for phase in self.PHASES}
+        # Removed widgets drop out, and their times are kept only for the
+        # frames in the history, as (frame, seconds)
+        self.widgets = WeakKeyDictionary()
+        self.frames_count = 0
+
+    def add_frame(self, phase_times):
+        self.frames_count += 1
+        self.frames.append(sum(phase_times.values()))
+        for phase, seconds in phase_times.items():
+            self.phases[phase].append(seconds)
+
+    def add_widget_time(self, widget, action, seconds):
+        times = self.widgets.get(widget)
+        if times is None:
+            times = self.widgets[widget] = {}
+        if action not in times:
+            times[action] = deque()
+        calls = times[action]
+        calls.append((self.frames_count, seconds))
+        while calls[0][0] <= self.frames_count - self.history:
+            calls.popleft()
+
+    def get_slowest_widgets(self, action='render', count=10):
+        start = self.frames_count - self.history
+        widgets = []
+        for widget, times in list(self.widgets.items()):
+            values = [seconds for frame, seconds in times.get(action, ())
+                      if frame >= start]
+            if values:
+                widgets.append((widget, (sum(values), len(values),
+                                         max(values))))
+        widgets.sort(key=lambda item: item[1][0], reverse=True)
+        return [{'widget': '{}@{:x}'.format(type(widget).__name__,
+                                             id(widget)),
+                 'total': total, 'calls': calls, 'max': longest}
+                for widget, (total, calls, longest) in widgets[:count]]
+
+    def get_stats(self, count=10):
+        return {'frames': self.frames_count,
+                'frame': get_summary(self.frames),
+                'phases': {phase: get_summary(values)
+                           for phase, values in self.phases.items()},
+                'slowest_render': self.get_slowest_widgets('render', count),
+                'slowest_event': self.get_slowest_widgets('event', count)}
+
+    def dump(self, file_name, count=10):
+        with open(file_name, 'w') as file:
+            json.dump(self.get_stats(count), file, indent=4)
+
+    def clear(self):
+        self.frames.clear()
+        for values in self.phases.values():
+            values.clear()
+        self.widgets.clear()
+        self.frames_count = 0
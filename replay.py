@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+from time import monotonic, sleep
+
+import pygame as pg
+
+from profiling import get_summary
+from scheduling import timers
+
+TRACE_VERSION = 1
+
+
+def encode_value(value):
+    if isinstance(value, (tuple, list)):
+        return [encode_value(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError
+
+
+def encode_event(event):
+    attrs = {}
+    for name, value in event.dict.items():
+        # Objects like the SDL window can't be saved and aren't replayed
+        try:
+            attrs[name] = encode_value(value)
+        except TypeError:
+            pass
+    return [event.type, attrs]
+
+
+def decode_event(event_type, attrs):
+    return pg.event.Event(event_type, {
+        name: tuple(value) if isinstance(value, list) else value
+        for name, value in attrs.items()})
+
+
+def load_trace(file_name):
+    # A trace is a list of (seconds from the start, events of one frame)
+    frames = []
+    with gzip.open(file_name, 'rt') as file:
+        header = json.loads(file.readline())
+        if header.get('version') != TRACE_VERSION:
+            raise ValueError('Unknown trace version: {}'.format(
+                header.get('version')))
+        for line in file:
+            seconds, events = json.loads(line)
+            frames.append((seconds, [decode_event(*event)
+                                     for event in events]))
+    return frames
+
+
+class EventRecorder:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.file = None
+        self.start_time = None
+        self.frames_count = 0
+
+    def record(self, events):
+        # Events posted by the program itself (slots, timers of the user)
+        # come again on replay, so only the SDL ones are saved
+        events = [encode_event(event) for event in events
+                  if event.type < pg.USEREVENT]
+        if not events:
+            return
+        if self.file is None:
+            self.open()
+        self.file.write(json.dumps(
+            [round(monotonic() - self.start_time, 4), events],
+            separators=(',', ':')) + '\n')
+        self.frames_count += 1
+
+    def open(self):
+        if self.start_time is None:
+            # The time goes on between windows, so one trace covers them all
+            self.start_time = monotonic()
+            self.file = gzip.open(self.file_name, 'wt')
+            self.file.write(json.dumps({'version': TRACE_VERSION}) + '\n')
+        else:
+            self.file = gzip.open(self.file_name, 'at')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class EventReplayer:
+    def __init__(self, window, trace, realtime=True, headless=True):
+        self.window = window
+        self.trace = load_trace(trace) if isinstance(trace, str) else trace
+        self.realtime = realtime
+        self.headless = headless
+        self.posted = {}
+        self.received = []
+        self.latencies = []
+        self.dropped = 0
+        self.frames = None
+        self.next_frame = None
+
+    def run(self):
+        if self.headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        window = self.window
+        recorder, window.recorder = window.recorder, self
+        fps = window.fps
+        if not self.realtime:
+            # Frames follow each other without waiting for the clock
+            window.fps = 0
+        window.start()
+        self.frames = iter(self.trace)
+        self.next_frame = next(self.frames, None)
+        self.start_time = monotonic()
+        while window.running:
+            if self.realtime:
+                self.post_due()
+            elif self.next_frame is not None:
+                self.post_events(self.next_frame[1])
+                self.next_frame = next(self.frames, None)
+            if self.next_frame is None and\
+                    len(self.received) == len(self.posted):
+                # Every event is posted and has been processed
+                break
+            window.run_frame()
+            self.frame_done()
+        window.recorder = recorder
+        window.fps = fps
+        window.finish()
+        return self.get_report()
+
+    def post_due(self):
+        # The latency is counted from the recorded time, as the user made
+        # the event then, not when the next frame has got it
+        window = self.window
+        posted = False
+        while self.next_frame is not None:
+            made_time = self.start_time + self.next_frame[0]
+            delay = made_time - monotonic()
+            if delay > 0:
+                # A sleeping window would be woken up by the event, so the
+                # replayer sleeps for it, unless a timer comes earlier
+                if posted or not window.idle_mode or window.needs_render():
+                    return
+                timeout = timers.get_timeout()
+                if timeout is not None and timeout < delay:
+                    return
+                sleep(delay)
+            self.post_events(self.next_frame[1], made_time)
+            self.next_frame = next(self.frames, None)
+            posted = True
+
+    def post_events(self, events, made_time=None):
+        made_time = made_time if made_time is not None else monotonic()
+        for event in events:
+            event_id = len(self.posted) + self.dropped
+            self.posted[event_id] = (made_time, event.type)
+            # Event takes the dict itself, so the trace gets a copy
+            if not pg.event.post(pg.event.Event(
+                    event.type, dict(event.dict, replay_id=event_id))):
+                # Blocked by the event filter of the window
+                del self.posted[event_id]
+                self.dropped += 1
+
+    def record(self, events):
+        self.received.extend(event.replay_id for event in events
+                             if hasattr(event, 'replay_id'))
+
+    def frame_done(self):
+        # The frame is presented, so it reflects every event it has got
+        end = monotonic()
+        for event_id in self.received[len(self.latencies):]:
+            made_time, event_type = self.posted[event_id]
+            self.latencies.append((event_type, end - made_time))
+
+    def get_report(self):
+        types = {}
+        for event_type, seconds in self.latencies:
+            types.setdefault(pg.event.event_name(event_type),
+                             []).append(seconds)
+        return {'events': len(self.latencies),
+                'dropped': self.dropped,
+                'latency': get_summary(
+                    [seconds for event_type, seconds in self.latencies]),
+                'types': {name: get_summary(values)
+                          for name, values in types.items()}}
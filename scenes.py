@@ -0,0 +1,122 @@
+import pygame as pg
+
+from functions import preload_images
+
+
+class SceneManager:
+    SWITCH = 'switch'
+    PUSH = 'push'
+    POP = 'pop'
+    QUIT = 'quit'
+
+    def __init__(self):
+        self.scenes = []
+        self.transitions = []
+        self.to_prepare = []
+        self.last_scene = None
+        self.flags = None
+        self.running = False
+
+    def run(self, scene):
+        # One pygame session and display serve all the scenes, so fonts,
+        # images and chrome stay cached between them
+        pg.init()
+        self.running = True
+        self.push(scene)
+        self.apply_transitions()
+        while self.running and self.scenes:
+            scene = self.scenes[-1]
+            scene.run_frame()
+            if not scene.running:
+                self.scene_stopped(scene)
+            elif self.to_prepare:
+                self.prepare_scene(self.to_prepare.pop(0))
+            self.apply_transitions()
+        self.last_scene.close()
+        self.running = False
+
+    def switch(self, scene):
+        self.transitions.append((SceneManager.SWITCH, scene))
+
+    def push(self, scene):
+        self.transitions.append((SceneManager.PUSH, scene))
+
+    def pop(self):
+        self.transitions.append((SceneManager.POP, None))
+
+    def quit(self):
+        self.transitions.append((SceneManager.QUIT, None))
+
+    def prebuild(self, scene):
+        # The scene is prepared between frames of the current one, one scene
+        # per frame, and its images are decoded in the background at once
+        scene.manager = self
+        self.to_prepare.append(scene)
+        if scene.preload_names:
+            preload_images(*scene.preload_names)
+
+    def get_scene(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def scene_stopped(self, scene):
+        if scene.quitting:
+            self.quit()
+        elif scene.new_window_after_self is not None:
+            self.switch(scene.new_window_after_self)
+        else:
+            self.pop()
+
+    def apply_transitions(self):
+        while self.transitions:
+            action, scene = self.transitions.pop(0)
+            if action == SceneManager.QUIT:
+                while self.scenes:
+                    self.stop_scene(self.scenes.pop())
+                self.running = False
+            elif action == SceneManager.POP:
+                if self.scenes:
+                    self.stop_scene(self.scenes.pop())
+                if self.scenes:
+                    self.resume_scene(self.scenes[-1])
+            elif action == SceneManager.SWITCH:
+                if self.scenes:
+                    self.stop_scene(self.scenes.pop())
+                self.start_scene(scene)
+            else:
+                self.start_scene(scene)
+
+    def start_scene(self, scene):
+        if scene in self.to_prepare:
+            self.to_prepare.remove(scene)
+        scene.manager = self
+        scene.running = True
+        scene.quitting = False
+        self.scenes.append(scene)
+        self.last_scene = scene
+        pg.event.set_allowed(None)
+        scene.start(self.get_screen(scene))
+
+    def resume_scene(self, scene):
+        self.last_scene = scene
+        pg.event.set_allowed(None)
+        pg.mouse.set_visible(scene.cursor_name is None)
+        scene.activate(self.get_screen(scene))
+
+    def stop_scene(self, scene):
+        scene.running = False
+        scene.code_after_game_cycle()  # USER CODE
+        scene.leave()
+        if scene.cursor_name is not None:
+            pg.mouse.set_visible(True)
+
+    def prepare_scene(self, scene):
+        scene.prepare(pg.display.get_surface())
+
+    def get_screen(self, scene):
+        flags = pg.RESIZABLE if scene.resizable else 0
+        screen = pg.display.get_surface()
+        if screen is None or screen.get_size() != tuple(scene.size) or\
+                flags != self.flags:
+            screen = pg.display.set_mode(scene.size, flags)
+            self.flags = flags
+        return screen
@@ -0,0 +1,147 @@
+import heapq
+import time
+import traceback
+from itertools import islice
+
+
+class Timer:
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, timer):
+        return self.deadline < timer.deadline
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerScheduler:
+    def __init__(self):
+        self.timers = []
+
+    def call_at(self, deadline, callback):
+        timer = Timer(deadline, callback)
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def call_later(self, delay, callback):
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def get_timeout(self):
+        while self.timers and self.timers[0].cancelled:
+            heapq.heappop(self.timers)
+        if not self.timers:
+            return
+        return max(0, self.timers[0].deadline - time.monotonic())
+
+    def run_due(self):
+        now = time.monotonic()
+        while self.timers and self.timers[0].deadline <= now:
+            timer = heapq.heappop(self.timers)
+            if not timer.cancelled:
+                timer.callback()
+
+    def clear(self):
+        self.timers = []
+
+
+class Task:
+    def __init__(self, generator, priority=0, callback=None):
+        self.generator = generator
+        self.priority = priority
+        self.callback = callback
+        self.cancelled = False
+        self.done = False
+        self.result = None
+        self.error = None
+
+    def cancel(self):
+        if not self.done:
+            self.cancelled = True
+
+    def step(self):
+        try:
+            next(self.generator)
+            return
+        except StopIteration as stop:
+            self.done = True
+            self.result = stop.value
+        if self.callback is not None:
+            self.callback(self.result)
+
+
+class TaskScheduler:
+    # Tasks are generators doing a bit of work between their yields. Each
+    # frame they run until the budget is spent, the ones with the higher
+    # priority first and the ones with the same priority by turns
+    def __init__(self):
+        self.tasks = []
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def add(self, generator, priority=0, callback=None):
+        task = Task(generator, priority, callback)
+        self.push(task)
+        return task
+
+    def push(self, task):
+        heapq.heappush(self.tasks, (-task.priority, self.counter, task))
+        self.counter += 1
+
+    def run(self, budget):
+        deadline = time.perf_counter() + budget
+        # At least one step is made, so a small budget doesn't stop tasks
+        while self.tasks:
+            task = heapq.heappop(self.tasks)[2]
+            if task.cancelled:
+                task.generator.close()
+                continue
+            try:
+                task.step()
+            except Exception as error:
+                # A failed task is dropped, the window goes on running
+                task.done = True
+                task.error = error
+                self.report(task)
+            if not task.done and not task.cancelled:
+                self.push(task)
+            if time.perf_counter() >= deadline:
+                break
+
+    def report(self, task):
+        traceback.print_exception(type(task.error), task.error,
+                                  task.error.__traceback__)
+
+    def clear(self):
+        for priority, counter, task in self.tasks:
+            task.cancel()
+            task.generator.close()
+        self.tasks = []
+
+
+timers = TimerScheduler()
+
+
+def run_in_chunks(items, function, size=100, budget=0.002):
+    # A task calling function with parts of items, e.g. model.extend. The
+    # next part is sized from the time of the previous one, so a step stays
+    # near the budget however long function takes for an item
+    items = iter(items)
+    while True:
+        # Taking the items is timed too, as items may be made on the fly
+        start = time.perf_counter()
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        function(chunk)
+        seconds = time.perf_counter() - start
+        if len(chunk) < size:
+            return
+        # Parts grow at most twice at a time, as a quick step may be chance
+        fitting = int(budget * len(chunk) / seconds) if seconds else size * 2
+        size = max(1, min(size * 2, fitting))
+        yield
@@ -0,0 +1,17 @@
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from base_widgets import Window
+
+
+@pytest.fixture
+def window():
+    window = Window(400, 300, 'Test')
+    window.start()
+    yield window
+    window.finish()
@@ -0,0 +1,44 @@
+import pygame as pg
+import pytest
+
+from assets import AssetManager
+
+
+@pytest.fixture
+def image_name(tmp_path, window):
+    name = str(tmp_path / 'image.png')
+    surface = pg.Surface((8, 8))
+    surface.fill((10, 20, 30))
+    pg.image.save(surface, name)
+    return name
+
+
+def test_load_image_returns_copies(image_name):
+    manager = AssetManager()
+    first = manager.load_image(image_name)
+    first.fill((255, 0, 0))
+    second = manager.load_image(image_name)
+    assert second is not first
+    assert second.get_at((0, 0))[:3] == (10, 20, 30)
+
+
+def test_shared_image_is_cached(image_name):
+    manager = AssetManager()
+    assert manager.load_image(image_name, shared=True) is\
+        manager.load_image(image_name, shared=True)
+    assert manager.get_stats()['hits'] == 1
+
+
+def test_preloaded_images_are_bounded(tmp_path, window):
+    names = []
+    for index in range(5):
+        name = str(tmp_path / '{}.png'.format(index))
+        pg.image.save(pg.Surface((4, 4)), name)
+        names.append(name)
+    manager = AssetManager(max_images=2)
+    manager.preload(*names)
+    manager.shutdown()
+    for name in names:
+        manager.load_image(name)
+    assert manager.get_stats()['decoded'] <= 2
+    assert not manager.pending
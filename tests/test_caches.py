@@ -0,0 +1,60 @@
+import pygame as pg
+import pytest
+
+from caches import LRUCache, FontCache, ImageCache
+
+
+def test_lru_cache_drops_least_recent():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache and len(cache) == 2
+    assert cache.get('b', 'missing') == 'missing'
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'size': 2,
+                                 'maxsize': 2}
+
+
+@pytest.mark.parametrize('text, w, h', [('Label', 120, 40),
+                                        ('A longer line of text', 300, 30),
+                                        ('x', 10, 10), ('', 50, 20)])
+def test_max_font_size_matches_countdown(window, text, w, h):
+    font_cache = FontCache()
+    size = font_cache.get_max_size(text, w, h, 100)
+    expected = 100
+    while expected > 1:
+        text_w, text_h = pg.font.Font(None, expected).size(text)
+        if text_w < w and text_h < h:
+            break
+        expected -= 1
+    assert size == expected
+    # The second call is answered by the cache
+    hits = font_cache.fits.hits
+    assert font_cache.get_max_size(text, w, h, 100) == size
+    assert font_cache.fits.hits == hits + 1
+
+
+def test_scaled_images_are_shared(window):
+    image_cache = ImageCache()
+    image = pg.Surface((20, 20))
+    scaled = image_cache.get_scaled(image, (10, 10))
+    assert image_cache.get_scaled(image, (10.4, 10)) is scaled
+    assert scaled.get_size() == (10, 10)
+    assert image_cache.get_stats()['hits'] == 1
+
+
+def test_image_budget_counts_a_source_once(window):
+    image = pg.Surface((20, 20))
+    image_cache = ImageCache()
+    first = image_cache.get_scaled(image, (10, 10))
+    second = image_cache.get_scaled(image, (10, 10), smooth=True)
+    used = sum(map(image_cache.get_bytes, (image, first, second)))
+    assert image_cache.bytes == used
+    image_cache.max_bytes = used
+    # The oldest scaled copy is dropped to stay in the budget
+    image_cache.get_scaled(image, (5, 20))
+    assert len(image_cache.data) == 2
+    assert image_cache.bytes <= image_cache.max_bytes
+    image_cache.clear()
+    assert image_cache.bytes == 0 and not image_cache.sources
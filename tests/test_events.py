@@ -0,0 +1,88 @@
+import pygame as pg
+
+from events import EventRouter, coalesce_motion
+
+
+class Receiver:
+    EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION, pg.KEYDOWN)
+    HIT_EVENT_TYPES = (pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION)
+
+    def __init__(self, rect):
+        self.rect = pg.Rect(rect)
+        self.events = []
+
+    def process_event(self, event):
+        self.events.append(event.type)
+
+
+def click(pos):
+    return pg.event.Event(pg.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+
+def motion(pos):
+    return pg.event.Event(pg.MOUSEMOTION, pos=pos, rel=(0, 0),
+                          buttons=(0, 0, 0))
+
+
+def test_clicks_reach_widgets_under_pointer():
+    router = EventRouter(cell_size=32)
+    left, right = Receiver((0, 0, 50, 50)), Receiver((100, 0, 50, 50))
+    wide = Receiver((0, 0, 200, 20))
+    for widget in (left, right, wide):
+        router.add(widget)
+    assert router.get_receivers(click((10, 10))) == [left, wide]
+    assert router.get_receivers(click((120, 30))) == [right]
+    assert router.get_receivers(click((80, 40))) == []
+
+
+def test_keys_reach_all_subscribers_in_order():
+    router = EventRouter()
+    widgets = [Receiver((x * 60, 0, 50, 50)) for x in range(3)]
+    for widget in reversed(widgets):
+        router.add(widget)
+    key = pg.event.Event(pg.KEYDOWN, key=pg.K_a)
+    assert router.get_receivers(key) == widgets[::-1]
+
+
+def test_moved_and_removed_widgets():
+    router = EventRouter(cell_size=32)
+    widget = Receiver((0, 0, 20, 20))
+    router.add(widget)
+    widget.rect.topleft = (300, 300)
+    router.move(widget)
+    assert router.get_receivers(click((10, 10))) == []
+    assert router.get_receivers(click((310, 310))) == [widget]
+    router.remove(widget)
+    assert router.get_receivers(click((310, 310))) == []
+
+
+def test_left_widget_gets_motion_once():
+    router = EventRouter()
+    widget = Receiver((0, 0, 50, 50))
+    router.add(widget)
+    assert router.get_receivers(motion((10, 10))) == [widget]
+    # The pointer has left, the widget resets its hover state
+    assert router.get_receivers(motion((100, 100))) == [widget]
+    assert router.get_receivers(motion((120, 100))) == []
+
+
+def test_motion_is_coalesced_between_other_events():
+    events = [pg.event.Event(pg.MOUSEMOTION, pos=(1, 1), rel=(1, 1),
+                             buttons=(0, 0, 0)),
+              pg.event.Event(pg.MOUSEMOTION, pos=(3, 2), rel=(2, 1),
+                             buttons=(0, 0, 0)),
+              click((3, 2)),
+              pg.event.Event(pg.MOUSEMOTION, pos=(4, 2), rel=(1, 0),
+                             buttons=(1, 0, 0))]
+    coalesced = coalesce_motion(events)
+    assert [event.type for event in coalesced] == [
+        pg.MOUSEMOTION, pg.MOUSEBUTTONDOWN, pg.MOUSEMOTION]
+    assert coalesced[0].pos == (3, 2) and coalesced[0].rel == (3, 2)
+    assert coalesced[2] is events[3]
+
+
+def test_window_coalesces_when_asked(window):
+    events = [motion((1, 1)), motion((2, 2))]
+    assert window.prepare_events(events) == events
+    window.set_motion_coalescing(True)
+    assert len(window.prepare_events(events)) == 1
@@ -0,0 +1,71 @@
+import pickle
+
+import pytest
+
+from additional_classes import Align, Alignment, NotAlignmentError,\
+    OppositeAlignmentError
+from base_widgets import PushButton, Label
+from layouts import HBoxLayout, VBoxLayout, GridLayout, distribute
+
+
+def test_alignment_contains_its_parts():
+    top_left = Align.LEFT & Align.TOP
+    assert top_left == Align.LEFT and top_left == Align.TOP
+    assert Align.LEFT != top_left
+    assert top_left == Align.CENTER and Align.CENTER == Align.CENTER
+    assert Align.LEFT != Align.RIGHT
+    with pytest.raises(NotAlignmentError):
+        top_left == 'left'
+
+
+def test_alignments_are_interned():
+    assert Align.TOP & Align.LEFT is Align.LEFT & Align.TOP
+    assert pickle.loads(pickle.dumps(Align.BOTTOM)) is Align.BOTTOM
+    with pytest.raises(AttributeError):
+        Align.LEFT.horizontal = Alignment.RIGHT
+    with pytest.raises(OppositeAlignmentError):
+        Align.LEFT & Align.RIGHT
+
+
+def test_distribute_keeps_every_pixel():
+    assert distribute([10, 10, 10], [1, 1, 1], 100) == [33, 33, 34]
+    assert distribute([10, 10], [0, 1], 15) == [10, 10]
+    assert sum(distribute([0, 0, 0], [1, 2, 4], 101)) == 101
+
+
+def test_box_layout_stretches_items(window):
+    buttons = [PushButton(window, (0, 0, 50, 30), str(index))
+               for index in range(3)]
+    layout = HBoxLayout((0, 0, 300, 40), margin=5, spacing=10)
+    layout.add_widget(buttons[0])
+    layout.add_widget(buttons[1], stretch=1)
+    layout.add_widget(buttons[2], alignment=Align.TOP)
+    assert layout.get_min_size() == (180, 40)
+    assert layout.arrange()
+    assert [button.rect.x for button in buttons] == [5, 65, 245]
+    assert buttons[1].w == 170
+    assert (buttons[2].y, buttons[2].h) == (5, 30)
+    assert not layout.arrange()
+
+
+def test_layout_measures_again_after_text_change(window):
+    label = Label(window, (0, 0, 10, 10), 'x', font_size=20)
+    layout = VBoxLayout((0, 0, 400, 300))
+    layout.add_widget(label)
+    size = layout.get_min_size()
+    label.set_text('a much longer text than before')
+    assert layout.dirty
+    assert layout.get_min_size()[0] > size[0]
+
+
+def test_grid_layout_spans(window):
+    layout = GridLayout((0, 0, 210, 100), spacing=10)
+    wide = PushButton(window, (0, 0, 100, 40), 'Wide')
+    cells = [PushButton(window, (0, 0, 50, 40), str(index))
+             for index in range(2)]
+    layout.add_widget(wide, 0, 0, column_span=2)
+    layout.add_widget(cells[0], 1, 0)
+    layout.add_widget(cells[1], 1, 1)
+    layout.arrange()
+    assert wide.rect == (0, 0, 210, 45)
+    assert cells[1].rect == (110, 55, 100, 45)
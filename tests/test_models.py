@@ -0,0 +1,141 @@
+import pytest
+
+from advanced_widgets import ScrollList
+from models import ListModel, GapBuffer, run_steps
+
+ELEMENTS = [('Item {}'.format(i), i) for i in range(1000)]
+
+
+def texts(model):
+    return [item for item, info in model]
+
+
+def test_filter_steps_matches_set_filter():
+    model = ListModel(ELEMENTS)
+    steps = ListModel(ELEMENTS)
+    for text in ('1', '12', '123', '12', '', '9'):
+        model.set_filter(text)
+        run_steps(steps.filter_steps(text, size=100))
+        assert texts(model) == texts(steps)
+
+
+def test_filter_steps_by_parts():
+    model = ListModel(ELEMENTS)
+    steps = model.filter_steps('5', size=100)
+    for _ in range(5):
+        next(steps)
+    # The view stays as it was until the search ends
+    assert len(model) == len(ELEMENTS)
+    run_steps(steps)
+    assert all('5' in text for text in texts(model))
+
+
+def test_sorted_filter_steps():
+    model = ListModel(ELEMENTS)
+    model.set_sort(key=lambda element: -element[1])
+    run_steps(model.filter_steps('99', size=7))
+    infos = [info for item, info in model]
+    assert infos[:11] == [999, 998, 997, 996, 995, 994, 993, 992, 991, 990,
+                          899]
+    assert infos == sorted(infos, reverse=True) and infos[-1] == 99
+
+
+def test_filter_steps_after_change():
+    model = ListModel(ELEMENTS)
+    steps = model.filter_steps('7', size=100)
+    next(steps)
+    model.extend([('Item 7777', 7777)])
+    run_steps(steps)
+    assert texts(model)[-1] == 'Item 7777'
+    assert model.filter_text == '7'
+
+
+def test_scroll_list_filters_in_task(window):
+    scroll_list = ScrollList(window, (0, 0, 200, 200), 'List')
+    scroll_list.set_elements(ELEMENTS)
+    scroll_list.set_filter('12')
+    scroll_list.set_filter('123')
+    assert len(scroll_list.model) == len(ELEMENTS)
+    while window.tasks:
+        window.tasks.run(1)
+    assert texts(scroll_list.model) == ['Item 123']
+    assert scroll_list.filter_task is None
+
+
+def test_typing_narrows_previous_result():
+    model = ListModel(ELEMENTS)
+    model.set_filter('1')
+    model.set_filter('12')
+    # The search for '12' looked only at the elements matching '1'
+    assert model.results.hits >= 1
+    assert texts(model) == [text for text, info in ELEMENTS if '12' in text]
+
+
+def test_prefix_and_substring_searches():
+    model = ListModel([('Apple', 1), ('pineapple', 2), ('Apricot', 3)])
+    model.set_filter('ap', ListModel.PREFIX)
+    assert texts(model) == ['Apple', 'Apricot']
+    model.set_filter('APP')
+    assert texts(model) == ['Apple', 'pineapple']
+    # A longer text is looked up in the index instead of a scan
+    model.set_filter('neap')
+    assert texts(model) == ['pineapple']
+
+
+def test_sort_follows_extend():
+    model = ListModel([('b', 2), ('d', 4)])
+    model.set_sort(key=lambda element: element[1])
+    model.extend([('a', 1), ('c', 3)])
+    assert texts(model) == ['a', 'b', 'c', 'd']
+    model.set_sort(key=lambda element: element[1], reverse=True)
+    model.append('e', 5)
+    assert texts(model) == ['e', 'd', 'c', 'b', 'a']
+
+
+def test_extend_keeps_filter():
+    model = ListModel(ELEMENTS[:10])
+    model.set_filter('item 1')
+    model.extend(ELEMENTS[10:20])
+    assert texts(model) == ['Item 1'] + ['Item {}'.format(i)
+                                         for i in range(10, 20)]
+    model.set_filter('')
+    model.extend([('New', None)])
+    assert len(model) == 21 and model[20] == ('New', None)
+
+
+def test_view_and_source_indices():
+    model = ListModel(ELEMENTS[:10])
+    model.set_sort(key=lambda element: -element[1])
+    assert model.get_source_index(0) == 9
+    assert model.get_view_index(9) == 0
+    model.set_filter('5')
+    assert model.get_view_index(9) is None
+    assert model.get_source_index(1) is None
+
+
+def test_gap_buffer_edits_like_a_list():
+    buffer = GapBuffer(range(5), gap_size=2)
+    expected = list(range(5))
+    edits = [(2, 2, ['a']), (0, 1, []), (4, 4, ['b', 'c', 'd', 'e']),
+             (1, 3, ['f']), (-1, -1, ['g'])]
+    for start, end, items in edits:
+        if start < 0:
+            start = end = len(expected)
+        buffer.replace(start, end, items)
+        expected[start:end] = items
+        assert list(buffer) == expected
+        assert len(buffer) == len(expected)
+    assert buffer[-1] == 'g' and buffer.get_range(1, 3) == expected[1:3]
+
+
+def test_gap_buffer_moves_and_grows():
+    buffer = GapBuffer(['x'], gap_size=1)
+    for index in range(100):
+        buffer.insert(index % (len(buffer) + 1), index)
+    buffer.delete(10, 60)
+    assert len(buffer) == 51
+    # The places left in the gap don't keep deleted items alive
+    assert buffer.items[buffer.gap_start:buffer.gap_end] ==\
+        [None] * (buffer.gap_end - buffer.gap_start)
+    with pytest.raises(IndexError):
+        buffer[51]
@@ -0,0 +1,53 @@
+import gc
+import json
+
+from profiling import FrameStats, get_percentile, get_summary
+
+
+class Widget:
+    pass
+
+
+def test_summary():
+    values = [0.001 * index for index in range(1, 101)]
+    summary = get_summary(values)
+    assert summary['max'] == values[-1]
+    assert summary['p50'] == values[50]
+    assert summary['p95'] == values[94]
+    assert abs(summary['mean'] - 0.0505) < 1e-9
+    assert get_percentile([], 95) == 0 and get_summary([])['max'] == 0
+
+
+def test_frames_are_kept_for_history():
+    stats = FrameStats(history=3)
+    for index in range(5):
+        stats.add_frame({'events': index, 'render': 1})
+    result = stats.get_stats()
+    assert result['frames'] == 5
+    assert result['frame']['max'] == 5 and result['frame']['p50'] == 4
+    assert result['phases']['events']['mean'] == 3
+
+
+def test_slowest_widgets_in_history():
+    stats = FrameStats(history=2)
+    fast, slow = Widget(), Widget()
+    for _ in range(3):
+        stats.add_frame({'render': 0})
+        stats.add_widget_time(fast, 'render', 0.001)
+        stats.add_widget_time(slow, 'render', 0.01)
+    slowest = stats.get_slowest_widgets()
+    assert [item['calls'] for item in slowest] == [2, 2]
+    assert slowest[0]['widget'].startswith('Widget@')
+    assert slowest[0]['max'] == 0.01
+    del slow
+    gc.collect()
+    assert len(stats.get_slowest_widgets()) == 1
+
+
+def test_dump(tmp_path):
+    stats = FrameStats()
+    stats.add_frame({'render': 0.002})
+    name = tmp_path / 'stats.json'
+    stats.dump(str(name))
+    with open(name) as file:
+        assert json.load(file)['frames'] == 1
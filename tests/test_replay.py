@@ -0,0 +1,56 @@
+import gzip
+
+import pygame as pg
+import pytest
+
+from base_widgets import Window, LineEdit
+from replay import EventRecorder, EventReplayer, load_trace
+
+
+class TypingWindow(Window):
+    def __init__(self):
+        super().__init__(300, 100, 'Typing')
+
+    def code_before_game_cycle(self):
+        self.line_edit = LineEdit(self, (0, 0, 300, 40))
+        self.add_widgets(self.line_edit)
+
+
+def typing_trace():
+    events = [[pg.event.Event(pg.MOUSEBUTTONDOWN, pos=(10, 10), button=1)]]
+    for symbol in 'abc':
+        events.append([pg.event.Event(pg.KEYDOWN, key=ord(symbol), mod=0,
+                                      unicode=symbol, scancode=0)])
+    return [(index * 0.01, frame) for index, frame in enumerate(events)]
+
+
+def test_trace_round_trip(tmp_path):
+    name = str(tmp_path / 'events.trace.gz')
+    recorder = EventRecorder(name)
+    for seconds, events in typing_trace():
+        recorder.record(events + [pg.event.Event(pg.USEREVENT)])
+    recorder.close()
+    trace = load_trace(name)
+    assert len(trace) == 4
+    assert trace[0][1][0].pos == (10, 10)
+    # The events posted by the program itself are not saved
+    assert [event.unicode for seconds, events in trace[1:]
+            for event in events] == ['a', 'b', 'c']
+
+
+def test_unknown_trace_version(tmp_path):
+    name = str(tmp_path / 'events.trace.gz')
+    with gzip.open(name, 'wt') as file:
+        file.write('{"version": 0}\n')
+    with pytest.raises(ValueError):
+        load_trace(name)
+
+
+def test_replay_is_deterministic():
+    texts = []
+    for _ in range(2):
+        window = TypingWindow()
+        report = EventReplayer(window, typing_trace(), realtime=False).run()
+        texts.append(window.line_edit.get_text())
+        assert report['events'] == 4 and not report['dropped']
+    assert texts == ['abc', 'abc']
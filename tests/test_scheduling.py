@@ -0,0 +1,109 @@
+import time
+
+from scheduling import TaskScheduler, TimerScheduler, run_in_chunks
+
+
+def slow_chunk(chunks):
+    def function(chunk):
+        chunks.append(len(chunk))
+        time.sleep(0.0002 * len(chunk))
+    return function
+
+
+def test_chunks_shrink_to_the_budget():
+    chunks = []
+    task = run_in_chunks(range(2000), slow_chunk(chunks), size=100,
+                         budget=0.002)
+    for _ in task:
+        pass
+    assert sum(chunks) == 2000
+    # A part of 0.2 ms items fits 10 of them into the budget
+    assert chunks[0] == 100
+    assert max(chunks[1:]) <= 12
+
+
+def test_chunks_grow_at_most_twice():
+    chunks = []
+    for _ in run_in_chunks(range(1000), chunks.append, size=10):
+        pass
+    sizes = [len(chunk) for chunk in chunks]
+    assert sizes[:4] == [10, 20, 40, 80]
+    assert sum(sizes) == 1000
+
+
+def test_failed_task_is_dropped():
+    scheduler = TaskScheduler()
+    scheduler.report = lambda task: None
+
+    def failing():
+        yield
+        raise ValueError('failed')
+
+    task = scheduler.add(failing())
+    scheduler.run(1)
+    assert task.done and isinstance(task.error, ValueError)
+    assert not len(scheduler)
+
+
+def steps(name, count, log):
+    for index in range(count):
+        log.append(name)
+        yield
+    return name
+
+
+def test_higher_priority_runs_first_and_same_by_turns():
+    scheduler = TaskScheduler()
+    log = []
+    scheduler.add(steps('low', 2, log))
+    scheduler.add(steps('a', 2, log), priority=1)
+    scheduler.add(steps('b', 2, log), priority=1)
+    while len(scheduler):
+        scheduler.run(1)
+    assert log == ['a', 'b', 'a', 'b', 'low', 'low']
+
+
+def test_budget_stops_the_run():
+    scheduler = TaskScheduler()
+
+    def slow():
+        while True:
+            time.sleep(0.002)
+            yield
+
+    scheduler.add(slow())
+    start = time.perf_counter()
+    scheduler.run(0.005)
+    assert time.perf_counter() - start < 0.02
+    # A zero budget still makes one step
+    log = []
+    scheduler.clear()
+    scheduler.add(steps('one', 3, log))
+    scheduler.run(0)
+    assert log == ['one']
+
+
+def test_callback_and_cancel():
+    scheduler = TaskScheduler()
+    results = []
+    log = []
+    scheduler.add(steps('done', 1, log), callback=results.append)
+    cancelled = scheduler.add(steps('cancelled', 5, log))
+    scheduler.run(0)
+    cancelled.cancel()
+    while len(scheduler):
+        scheduler.run(1)
+    assert results == ['done'] and 'cancelled' not in log
+    assert cancelled.cancelled and not cancelled.done
+
+
+def test_timers_run_in_order_when_due():
+    timers = TimerScheduler()
+    calls = []
+    timers.call_later(0, lambda: calls.append('second'))
+    timers.call_at(0, lambda: calls.append('first'))
+    timers.call_later(60, lambda: calls.append('later'))
+    timers.call_later(0, lambda: calls.append('cancelled')).cancel()
+    timers.run_due()
+    assert calls == ['first', 'second']
+    assert 59 < timers.get_timeout() <= 60
@@ -0,0 +1,126 @@
+from itertools import accumulate
+
+import pygame as pg
+import pytest
+
+from base_widgets import PushButton, Image, Label, LineEdit
+from advanced_widgets import TabWidget, ScrollList, ScrollElement, TextEdit
+from functions import get_glyph_advance
+
+
+def make_widgets(window):
+    return [PushButton(window, (0, 0, 100, 40), 'Button'),
+            Image(window, (0, 0, 40, 40), pg.Surface((10, 10))),
+            Label(window, (0, 0, 100, 40), 'Label'),
+            LineEdit(window, (0, 0, 100, 40)),
+            TabWidget(window, (0, 0, 200, 200), ['One', 'Two']),
+            ScrollList(window, (0, 0, 200, 200), 'List'),
+            ScrollElement(window, (0, 0, 200, 40), 'Element'),
+            TextEdit(window, (0, 0, 200, 200))]
+
+
+def test_widgets_have_no_dict(window):
+    for widget in make_widgets(window):
+        assert not hasattr(widget, '__dict__'), type(widget).__name__
+
+
+def test_group_membership(window):
+    label = Label(window, (0, 0, 100, 40), 'Label')
+    assert not label.alive()
+    window.add_widgets(label)
+    assert label.alive() and window.widgets_group.has(label)
+    assert label.groups() == [window.widgets_group]
+    window.add_widgets(label)
+    assert len(window.widgets_group) == 1
+    label.kill()
+    assert not label.alive() and not window.widgets_group.has(label)
+
+
+@pytest.mark.parametrize('name, value', [('x', 10), ('y', 20), ('w', 150),
+                                         ('h', 60)])
+def test_coordinates_are_assignable(window, name, value):
+    label = Label(window, (0, 0, 100, 40), 'Label')
+    setattr(label, name, value)
+    assert getattr(label, name) == value
+    assert label.dirty
+
+
+def test_scroll_element_keeps_its_surface(window):
+    element = ScrollElement(window, (0, 0, 200, 40), 'Element')
+    screen = pg.Surface((200, 40))
+    element.render(screen)
+    surface = element.surface
+    element.set_item('Element')
+    assert not element.redraw
+    element.set_item('Other')
+    assert element.redraw
+    element.render(screen)
+    assert element.surface is surface and not element.redraw
+    drawn = screen.copy()
+    element.set_selected(True)
+    element.render(screen)
+    assert element.surface is surface
+    assert screen.get_at((1, 1)) != drawn.get_at((1, 1))
+
+
+def test_line_edit_offsets_follow_edits(window):
+    line_edit = LineEdit(window, (0, 0, 300, 40), 'hello world')
+    line_edit.set_caret(5)
+    line_edit.insert_text(' big')
+    line_edit.set_caret(0)
+    line_edit.insert_text('Oh, ')
+    line_edit.set_caret(len(line_edit.text))
+    line_edit.delete(-1)
+    widths = list(accumulate((get_glyph_advance(symbol, line_edit.font_size)
+                              for symbol in line_edit.text), initial=0))
+    offsets = [line_edit.get_offset(index)
+               for index in range(len(line_edit.text) + 1)]
+    assert line_edit.text == 'Oh, hello big worl'
+    assert offsets == widths
+    assert line_edit.get_index_at(line_edit.get_text_coords()[0] +
+                                  offsets[4]) == 4
+
+
+def key_event(key, unicode='', mod=0):
+    return pg.event.Event(pg.KEYDOWN, key=key, unicode=unicode, mod=mod)
+
+
+@pytest.mark.parametrize('make_editor', [
+    lambda window: LineEdit(window, (0, 0, 300, 40), 'some text'),
+    lambda window: TextEdit(window, (0, 0, 300, 200), 'some text')])
+def test_editors_share_keys(window, make_editor):
+    editor = make_editor(window)
+    editor.set_active(True)
+    assert editor.blink_timer is not None
+    editor.process_key(key_event(pg.K_a, 'a', pg.KMOD_CTRL))
+    assert editor.get_selected_text() == 'some text'
+    editor.process_key(key_event(pg.K_n, 'n'))
+    editor.process_key(key_event(pg.K_o, 'o'))
+    editor.process_key(key_event(pg.K_BACKSPACE))
+    assert editor.get_text() == 'n'
+    editor.deactivate()
+    assert not editor.active and editor.blink_timer is None
+
+
+def test_text_edit_lines(window):
+    text_edit = TextEdit(window, (0, 0, 300, 100), 'one\ntwo\r\nthree')
+    assert text_edit.get_lines_count() == 3
+    text_edit.set_caret((1, 3))
+    text_edit.insert_text('\nnew')
+    assert text_edit.get_text() == 'one\ntwo\nnew\nthree'
+    text_edit.set_caret((2, 0))
+    text_edit.delete(-1)
+    assert text_edit.get_line(1) == 'twonew'
+    text_edit.set_caret((0, 1))
+    text_edit.set_caret((2, 2), True)
+    assert text_edit.get_selected_text() == 'ne\ntwonew\nth'
+
+
+def test_text_edit_renders_visible_lines(window):
+    text = '\n'.join('line {}'.format(index) for index in range(1000))
+    text_edit = TextEdit(window, (0, 0, 300, 100), text)
+    text_edit.render(pg.Surface((300, 100)))
+    assert len(text_edit.line_surfaces) <= text_edit.get_visible_count()
+    text_edit.scroll(500)
+    text_edit.render(pg.Surface((300, 100)))
+    assert 'line 500' in text_edit.line_surfaces
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame as pg
+
+from base_widgets import Window, PushButton
+from executors import SLOT_DONE
+from scheduling import timers
+
+
+class CountingWindow(Window):
+    def __init__(self, frames, fps=60, next_window=None):
+        super().__init__(200, 100, 'Counting', fps=fps)
+        self.frames_left = frames
+        self.rendered = 0
+        if next_window is not None:
+            self.set_window_after_self(next_window)
+
+    async def code_after_render(self):
+        self.rendered += 1
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self.running = False
+
+
+def test_run_async_without_fps_limit():
+    window = CountingWindow(5, fps=0)
+    asyncio.run(window.run_async())
+    assert window.rendered == 5
+
+
+def test_run_async_runs_window_chain():
+    last = CountingWindow(2, fps=0)
+    first = CountingWindow(3, fps=0, next_window=last)
+    asyncio.run(first.run_async())
+    assert (first.rendered, last.rendered) == (3, 2)
+
+
+def test_run_async_profiles_frames():
+    window = CountingWindow(4, fps=0)
+    window.set_profiling(True)
+    asyncio.run(window.run_async())
+    stats = window.get_stats()
+    assert stats['frames'] == 4
+    assert set(stats['phases']) == set(window.stats.PHASES)
+
+
+def test_idle_run_async_lets_other_tasks_run():
+    window = CountingWindow(3, fps=0)
+    window.set_idle_mode(True)
+    ticks = []
+
+    def wake():
+        window.mark_dirty()
+
+    async def other():
+        while window.running:
+            ticks.append(window.rendered)
+            await asyncio.sleep(0.005)
+
+    async def main():
+        task = asyncio.create_task(other())
+        timers.call_later(0.05, wake)
+        timers.call_later(0.1, wake)
+        await window.run_async()
+        await task
+
+    asyncio.run(main())
+    assert window.rendered == 3
+    # The window waited for the timers without running frames
+    assert len(ticks) > 10
+
+
+def test_run_frame_calls_hooks():
+    calls = []
+
+    class HookWindow(Window):
+        def code_in_event_cycle(self, event):
+            calls.append(event.type)
+
+        def code_after_render(self):
+            calls.append('after')
+
+    window = HookWindow(200, 100)
+    window.start()
+    pg.event.post(pg.event.Event(pg.USEREVENT))
+    window.run_frame()
+    window.finish()
+    assert calls[-1] == 'after' and pg.USEREVENT in calls
+
+
+def test_coroutine_slot_does_not_block_run_frame(window):
+    done = []
+
+    async def slot():
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    button = PushButton(window, (0, 0, 100, 40), 'Slot', slot=slot,
+                        slot_callback=lambda future: done.append(
+                            future.result()))
+    window.add_widgets(button)
+    started = time.perf_counter()
+    button.call_slot()
+    assert time.perf_counter() - started < 0.05
+    assert button.busy
+    while button.busy and time.perf_counter() - started < 2:
+        window.run_frame()
+    assert done == ['done'] and not button.busy
+
+
+def test_slot_runs_on_standard_executor(window):
+    results = []
+    with ThreadPoolExecutor(1) as executor:
+        button = PushButton(window, (0, 0, 100, 40), 'Slot',
+                            slot=lambda: 'result', executor=executor,
+                            slot_callback=lambda future: results.append(
+                                future.result()))
+        window.add_widgets(button)
+        button.call_slot()
+        started = time.perf_counter()
+        while button.busy and time.perf_counter() - started < 2:
+            window.run_frame()
+    assert results == ['result'] and not button.busy
+
+
+def test_slot_result_survives_blocked_event(window):
+    button = PushButton(window, (0, 0, 100, 40), 'Slot',
+                        slot=lambda: time.sleep(0.02))
+    button.set_executor()
+    window.add_widgets(button)
+    pg.event.set_blocked(SLOT_DONE)
+    button.call_slot()
+    started = time.perf_counter()
+    while button.busy and time.perf_counter() - started < 2:
+        window.run_frame()
+    pg.event.set_allowed(SLOT_DONE)
+    assert not button.busy